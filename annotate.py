@@ -0,0 +1,62 @@
+"""Detection overlay drawn straight into an RGB buffer at display resolution.
+
+``Results.plot()`` annotates a full-resolution copy of the frame in BGR, which
+the UI then converts back to RGB, and for a tiled frame that means tens of
+megapixels drawn only to be shrunk by the browser. Here the frame is resized
+to the display size first, and boxes and labels are drawn into that one RGB
+array. The same array is used for display, the thumbnail and the download
+(encoded only when a download is requested).
+"""
+import cv2
+import numpy as np
+
+DISPLAY_SIZE = 1280
+# ultralytics default palette, so annotations look the same as Results.plot()
+PALETTE = [tuple(int(h[i:i + 2], 16) for i in (0, 2, 4)) for h in (
+    'FF3838', 'FF9D97', 'FF701F', 'FFB21D', 'CFD231', '48F90A', '92CC17', '3DDB86', '1A9334', '00D4BB',
+    '2C99A8', '00C2FF', '344593', '6473FF', '0018EC', '8438FF', '520085', 'CB38FF', 'FF95C8', 'FF37C7')]
+
+
+def fit_to_display(frame, max_side=DISPLAY_SIZE):
+    """Contiguous copy of frame with its longest side at most max_side -> (array, scale)"""
+    height, width = frame.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return np.array(frame[..., :3], dtype=np.uint8, order='C'), 1.0
+    # INTER_AREA is only fast for whole-number factors: reduce by one, then finish (< 2x) bilinearly
+    factor = int(longest / max_side)
+    if factor >= 2:
+        frame = cv2.resize(frame, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if frame.shape[1::-1] != size:
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR if factor >= 2 else cv2.INTER_AREA)
+    return np.ascontiguousarray(frame), scale
+
+
+def render_detections(frame, detections, names, max_side=DISPLAY_SIZE, labels=True):
+    """RGB array at display resolution with detections (in frame pixels) drawn on it.
+
+    frame is never modified, so a cached frame can be rendered again at
+    another threshold.
+    """
+    canvas, scale = fit_to_display(frame, max_side)
+    height, width = canvas.shape[:2]
+    line_width = max(round((height + width) / 2 * 0.003), 2)
+    font_scale = line_width / 3
+    thickness = max(line_width - 1, 1)
+    boxes = np.round(detections.xyxy * scale).astype(np.int32)
+    for (x0, y0, x1, y1), conf, cls in zip(boxes.tolist(), detections.conf.tolist(), detections.cls.tolist()):
+        color = PALETTE[cls % len(PALETTE)]
+        cv2.rectangle(canvas, (x0, y0), (x1, y1), color, line_width, cv2.LINE_AA)
+        if not labels:
+            continue
+        label = f"{names[cls]} {conf:.2f}"
+        text_width, text_height = cv2.getTextSize(label, 0, font_scale, thickness)[0]
+        # Label above the box, or inside it at the top edge of the image
+        above = y0 - text_height - 3 >= 0
+        top = y0 - text_height - 3 if above else y0
+        cv2.rectangle(canvas, (x0, top), (x0 + text_width, top + text_height + 3), color, -1, cv2.LINE_AA)
+        cv2.putText(canvas, label, (x0, top + text_height + 1), 0, font_scale, (255, 255, 255), thickness,
+                    cv2.LINE_AA)
+    return canvas
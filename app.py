@@ -1,14 +1,10 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image, ImageEnhance
-from ultralytics import YOLO
-import pandas as pd
-import plotly.express as px
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
+import tempfile
 import time
-import io
-import base64
+import uuid
+from functools import partial
 
 st.set_page_config(
     page_title="AlfaStack AI Inspector",
@@ -162,31 +158,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load AI Model
-@st.cache_resource
-def load_model():
-    return YOLO('yolov8n.pt')
-
-model = load_model()
-
-# Initialize session state
-if 'analysis_history' not in st.session_state:
-    st.session_state.analysis_history = []
-if 'current_results' not in st.session_state:
-    st.session_state.current_results = None
-if 'original_image' not in st.session_state:
-    st.session_state.original_image = None
-if 'processed_image' not in st.session_state:
-    st.session_state.processed_image = None
-
-# Helper function to create download link
-def get_image_download_link(img, filename, text):
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    href = f'<a href="data:file/png;base64,{img_str}" download="{filename}" style="background: linear-gradient(45deg, #3b82f6, #1e40af); color: white; padding: 0.5rem 1rem; text-decoration: none; border-radius: 8px; display: inline-block; margin: 0.5rem;">{text}</a>'
-    return href
-
 # Enterprise Header
 st.markdown("""
 <div class="enterprise-header">
@@ -195,6 +166,209 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# App modules (and through them numpy and cv2) load once the shell is already on screen;
+# the gating, dedup, video, annotation and comparison modules load where they are used
+from result_cache import ResultCache, make_cache_key
+from session_memory import ArtifactStore, make_thumbnail, session_state_nbytes
+from history_store import HistoryStore
+from instrumentation import Instrumentation, profile_call
+from exports import HISTORY_FORMATS, IMAGE_FORMATS, encode_image, export_history
+from detections import Detections
+from worker_pool import PoolManager, PoolUnavailable
+from model_registry import DEFAULT_MODEL_OPTION, MODEL_CATALOG, ModelRegistry, model_key
+from backends import BACKENDS, DEFAULT_BACKEND
+from tiling import DEFAULT_TILING, tiling_spec
+from preprocess import INFERENCE_SIZE
+from image_io import (ImageTooLarge, content_digest, decode_for_inference, decode_level, decode_preview,
+                      probe_image, pyramid_factor, zoom_crop)
+from inspector import (DEFAULT_WEIGHTS, FLOOR_CONFIDENCE, build_inspection, detect,
+                       get_verdict, history_record, inspect_batch, prepare_image, reuse_detections)
+
+# Load AI Model
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry(max_models=2, max_bytes=1024 * 1024 * 1024)
+
+model_registry = get_model_registry()
+
+def load_model(weights=DEFAULT_WEIGHTS, backend=DEFAULT_BACKEND, threads=None):
+    return model_registry.get(weights, backend, threads)
+
+# The selectors live in the Settings tab, which renders after the portal
+model_weights = MODEL_CATALOG[st.session_state.get('model_option', DEFAULT_MODEL_OPTION)]
+inference_backend = BACKENDS[st.session_state.get('inference_backend', "PyTorch")]
+inference_threads = st.session_state.get('inference_threads', 0) or None
+model_id = model_key(model_weights, inference_backend, inference_threads)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Worker processes shared by every session whose model matches the pool's
+@st.cache_resource
+def get_pool_manager():
+    return PoolManager()
+
+pool_manager = get_pool_manager()
+worker_pool = pool_manager.pool_for(model_weights, inference_backend)
+if worker_pool is not None:
+    model_error = worker_pool.error
+    model_loading = lambda: not worker_pool.is_ready() and worker_pool.error is None
+    model = worker_pool.model_for(st.session_state.session_id) if worker_pool.is_ready() else None
+else:
+    # Weights load and warm up on a background thread so the page renders straight away
+    model_future = model_registry.load_async(model_weights, inference_backend, inference_threads)
+    if model_future.done() and isinstance(model_future.exception(), ImportError):
+        st.error(f"⚠️ {model_future.exception()} - falling back to the PyTorch backend.")
+        inference_backend = DEFAULT_BACKEND
+        model_id = model_key(model_weights, inference_backend, inference_threads)
+        model_future = model_registry.load_async(model_weights, inference_backend, inference_threads)
+    model_error = model_future.exception() if model_future.done() else None
+    model_loading = lambda: not model_future.done()
+    model = model_future.result() if model_future.done() and model_error is None else None
+
+# Inference result cache shared by all sessions
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_entries=128, max_bytes=256 * 1024 * 1024)
+
+result_cache = get_result_cache()
+
+# Perceptual-hash index of recent images, shared by all sessions
+@st.cache_resource
+def get_duplicate_index():
+    from dedup_index import DuplicateIndex
+    return DuplicateIndex()
+
+# Golden references for fixed-fixture stations, with gate counters shared by all sessions
+@st.cache_resource
+def get_reference_library():
+    from golden_reference import ReferenceLibrary
+    return ReferenceLibrary()
+
+# Selected in the Settings tab; None inspects whole frames as usual
+reference_gate = None
+if st.session_state.get('golden_reference', "None") != "None":
+    from golden_reference import DEFAULT_GATE
+    reference_gate = get_reference_library().gate(
+        st.session_state.golden_reference,
+        pixel_tolerance=st.session_state.get('gate_pixel_tolerance', DEFAULT_GATE['pixel_tolerance']),
+        area_tolerance=st.session_state.get('gate_area_tolerance', DEFAULT_GATE['area_tolerance'] * 100) / 100)
+
+def duplicate_scope(*settings):
+    """Duplicate lookup for the current model and settings, or None when reuse is off (the default).
+
+    Exact resubmissions only, unless fuzzy matching is switched on in Settings.
+    """
+    if not st.session_state.get('dedup_enabled', False):
+        return None
+    from dedup_index import FUZZY_MAX_DISTANCE
+    gating = reference_gate.key if reference_gate is not None else "full"
+    context = "|".join(str(setting) for setting in (model_id, gating) + settings)
+    return get_duplicate_index().scope(context, st.session_state.get('dedup_distance', FUZZY_MAX_DISTANCE),
+                                       st.session_state.get('dedup_fuzzy', False))
+
+# Persistent inspection history shared by all sessions and restarts
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+history_store = get_history_store()
+
+# Per-stage latency histograms shared by all sessions
+@st.cache_resource
+def get_instrumentation():
+    return Instrumentation()
+
+instrumentation = get_instrumentation()
+
+# Inference frames behind each session's last result, under per-session and global budgets
+@st.cache_resource
+def get_artifact_store():
+    return ArtifactStore()
+
+artifact_store = get_artifact_store()
+
+def rebuild_frame(data, info, enhance, tiling):
+    """Model input for an upload, recreated when its artifact was evicted (no inference)"""
+    imgsz = None if tiling else INFERENCE_SIZE
+    image, _ = decode_for_inference(data, info, imgsz)
+    return prepare_image(image, enhance, imgsz)[0]
+
+ZOOM_DISPLAY_WIDTH = 800
+# Progress value and label shown as each inspection stage starts
+INSPECTION_STAGES = {
+    'decode': (0.1, "🖼️ Decoding image..."),
+    'preprocess': (0.25, "✨ Enhancing image..."),
+    'inference': (0.4, "🧠 Running AI inference..."),
+    'report': (0.9, "📝 Building report..."),
+}
+HISTORY_WINDOWS = {
+    "Last Hour": timedelta(hours=1),
+    "Last 24 Hours": timedelta(days=1),
+    "Last 7 Days": timedelta(days=7),
+    "Last 30 Days": timedelta(days=30),
+    "All Time": None,
+}
+
+# Initialize session state (compact results only; frames live in the artifact store)
+if 'current_results' not in st.session_state:
+    st.session_state.current_results = None
+
+# Bounded-memory decode helpers: the digest is the cache key, raw bytes are not hashed
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_preview(digest, _data, _info):
+    return decode_preview(_data, _info)
+
+# Encoded once per rendering and format, and only when a download asks for it
+@st.cache_data(max_entries=16, show_spinner=False)
+def encode_annotated(render_key, fmt, quality, _image):
+    return encode_image(_image, fmt, quality)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_pyramid_level(digest, factor, _data, _info):
+    return decode_level(_data, _info, factor)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_zoom(digest, zoom, display_width, _data, _info):
+    level = load_pyramid_level(digest, pyramid_factor(_info, zoom, display_width), _data, _info)
+    return zoom_crop(level, _info, zoom, display_width)
+
+def iter_batch_uploads(files):
+    """Lazily decode uploads at inference resolution, skipping ones over budget -> (name, image, factor, digest)"""
+    for f in files:
+        data = f.getvalue()
+        try:
+            info = probe_image(data)
+            # A valid header can still front truncated or corrupt pixel data
+            image, decode_factor = decode_for_inference(data, info, INFERENCE_SIZE)
+        except (ImageTooLarge, OSError) as e:
+            st.warning(f"🚫 Skipped {f.name}: {e}")
+            continue
+        yield f.name, image, decode_factor, content_digest(data)
+
+# Model status: poll until the background warm-up finishes, then rerun with the model
+if model is None:
+    if model_error is not None and worker_pool is not None:
+        st.error(f"❌ Inference worker pool failed: {model_error} - restart it under Settings → Performance.")
+    elif model_error is not None:
+        st.error(f"❌ Failed to load {model_weights} ({inference_backend}): {model_error}")
+        # The failure was reported above; the rerun starts a fresh load
+        if st.button("🔁 Retry Model Load"):
+            st.rerun()
+    else:
+        @st.fragment(run_every=1)
+        def model_warming_status():
+            if not model_loading():
+                st.rerun()
+            where = f"{worker_pool.workers} worker processes" if worker_pool else inference_backend
+            st.info(f"⏳ **AI model warming up** ({model_weights}, {where}) - "
+                    "inspection unlocks automatically when it is ready.")
+        
+        model_warming_status()
+
+# Heavy modules load once the shell is already on screen
+import pandas as pd
+import plotly.express as px
+
 # Main Dashboard with Tabs
 tab1, tab2, tab3 = st.tabs(["🔍 Inspection Portal", "📊 Analytics Dashboard", "⚙️ Settings & Help"])
 
@@ -213,10 +387,19 @@ with tab1:
         )
         st.markdown('</div>', unsafe_allow_html=True)
         
+        image_info = None
+        if uploaded_file:
+            upload_bytes = uploaded_file.getvalue()
+            upload_digest = content_digest(upload_bytes)
+            try:
+                image_info = probe_image(upload_bytes)
+                # The header probe passes truncated or corrupt files; decoding the preview does not
+                image = load_preview(upload_digest, upload_bytes, image_info)
+            except (ImageTooLarge, OSError) as e:
+                st.error(f"🚫 {uploaded_file.name}: {e}")
+                uploaded_file = None
+        
         if uploaded_file:
-            image = Image.open(uploaded_file)
-            st.session_state.original_image = image
-            
             # Image Preview with Zoom Options
             st.markdown("#### 🔍 Image Preview")
             col_a, col_b = st.columns([3, 1])
@@ -228,25 +411,23 @@ with tab1:
                 st.markdown("**Zoom Options**")
                 zoom_level = st.slider("Zoom Level", 1.0, 3.0, 1.0, 0.1, label_visibility="collapsed")
                 
-                # Apply zoom
+                # Apply zoom (centre crop from the smallest sufficient pyramid level)
                 if zoom_level != 1.0:
-                    width, height = image.size
-                    new_width = int(width * zoom_level)
-                    new_height = int(height * zoom_level)
-                    zoomed_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                    zoomed_image = load_zoom(upload_digest, zoom_level, ZOOM_DISPLAY_WIDTH, upload_bytes, image_info)
                     st.image(zoomed_image, caption=f"Zoomed View ({zoom_level}x)")
             
             # Image Analytics
             st.markdown("#### 📏 Image Analytics")
             col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+            width, height = image_info['size']
             with col_c1:
-                st.metric("Dimensions", f"{image.size[0]}x{image.size[1]}")
+                st.metric("Dimensions", f"{width}x{height}")
             with col_c2:
-                st.metric("Color Mode", image.mode)
+                st.metric("Color Mode", image_info['mode'])
             with col_c3:
-                st.metric("File Size", f"{len(uploaded_file.getvalue()) / 1024:.1f} KB")
+                st.metric("File Size", f"{image_info['bytes'] / 1024:.1f} KB")
             with col_c4:
-                aspect_ratio = image.size[0] / image.size[1]
+                aspect_ratio = width / height
                 st.metric("Aspect Ratio", f"{aspect_ratio:.2f}")
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -266,150 +447,225 @@ with tab1:
             with col_z:
                 enhance = st.checkbox("Enhance Image", value=True)
             
+            tiling = None
+            if st.checkbox("🧩 Tiled Inference (high-resolution images)", value=False):
+                col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+                with col_t1:
+                    tile_size = st.slider("Tile Size", 320, 1280, DEFAULT_TILING['tile_size'], 64)
+                with col_t2:
+                    tile_overlap = st.slider("Tile Overlap", 0.0, 0.5, DEFAULT_TILING['overlap'], 0.05)
+                with col_t3:
+                    tile_batch = st.slider("Tiles per Batch", 1, 32, DEFAULT_TILING['batch_size'])
+                with col_t4:
+                    # PyTorch predictors are not thread-safe; exported sessions are
+                    tile_workers = st.slider("Tile Workers", 1, 8, 1, disabled=inference_backend == DEFAULT_BACKEND)
+                tiling = dict(DEFAULT_TILING, tile_size=tile_size, overlap=tile_overlap, batch_size=tile_batch,
+                              workers=tile_workers if inference_backend != DEFAULT_BACKEND else 1)
+            
             # Action Center
-            if st.button("🚀 LAUNCH AI INSPECTION", use_container_width=True, type="primary"):
+            # Tiled inference always covers the whole frame, so the reference gate only applies without it
+            single_gate = reference_gate if not tiling else None
+            gate_spec = single_gate.key if single_gate is not None else ""
+            inspection_key = make_cache_key(upload_bytes, f"{model_id}|{tiling_spec(tiling)}{gate_spec}",
+                                            FLOOR_CONFIDENCE, enhance)
+            if single_gate is not None:
+                st.caption(f"🥇 Golden reference **{single_gate.product}** active - only changed regions are inspected.")
+            if st.button("🚀 LAUNCH AI INSPECTION", use_container_width=True, type="primary", disabled=model is None):
                 with st.spinner("**🔬 AI ENGINE ANALYZING MANUFACTURING QUALITY...**"):
-                    # Progress simulation
-                    progress_bar = st.progress(0)
-                    for percent in range(100):
-                        time.sleep(0.01)
-                        progress_bar.progress(percent + 1)
+                    progress_bar = st.progress(0, text="🔎 Checking result cache...")
+                    cached = result_cache.get(inspection_key)
+                    # A plain cache hit is an ordinary inspection; only a dedup match counts as a duplicate
+                    match = None
                     
-                    # AI Processing
-                    image_np = np.array(image)
+                    if cached is None:
+                        def show_stage(stage):
+                            progress_bar.progress(*INSPECTION_STAGES[stage])
+                        
+                        # AI Processing (once, at the floor confidence)
+                        inference_start = time.perf_counter()
+                        show_stage('decode')
+                        with instrumentation.stage('decode'):
+                            # Full resolution is only decoded for tiled inference
+                            try:
+                                inference_image, decode_factor = decode_for_inference(
+                                    upload_bytes, image_info, None if tiling else INFERENCE_SIZE)
+                            except OSError as e:
+                                progress_bar.empty()
+                                st.error(f"🚫 {uploaded_file.name}: {e}")
+                                st.stop()
+                        # Tiled results are at full resolution; only the standard path is deduplicated
+                        duplicates = duplicate_scope(FLOOR_CONFIDENCE, enhance) if not tiling else None
+                        image_hash = duplicates.hash(inference_image) if duplicates else None
+                        match = duplicates.find(image_hash, upload_digest) if duplicates else None
+                        if match is not None:
+                            stored, distance = match
+                            image_np, scale = prepare_image(inference_image, enhance)
+                            result, detections = reuse_detections(stored, image_info['size'], image_np,
+                                                                  scale / decode_factor, model.names)
+                            timings = {}
+                            del image_np
+                        else:
+                            run_detect = partial(detect, model, inference_image, enhance, tiling=tiling,
+                                                 decode_factor=decode_factor, progress=show_stage,
+                                                 reference=single_gate)
+                            try:
+                                if st.session_state.get('profile_inspections'):
+                                    (result, detections, timings), profile_text, profile_data = profile_call(run_detect)
+                                    st.session_state.last_profile = {'image_name': uploaded_file.name,
+                                                                     'text': profile_text, 'data': profile_data}
+                                else:
+                                    result, detections, timings = run_detect()
+                            except PoolUnavailable as e:
+                                progress_bar.empty()
+                                st.error(f"❌ {e}")
+                                st.stop()
+                            del run_detect
+                            model_registry.record_latency(model_id, time.perf_counter() - inference_start)
+                            instrumentation.record_timings(timings, "tiled " if tiling else "")
+                            if duplicates:
+                                duplicates.add(image_hash, {'detections': detections, 'image_name': uploaded_file.name,
+                                                            'size': image_info['size']}, upload_digest)
+                        del inference_image
+                        cached = {'result': result, 'detections': detections, 'timings': timings,
+                                  'gate': timings.get('reference')}
+                        if match is not None:
+                            cached.update(duplicate_of=stored['image_name'], hash_distance=distance)
+                        cached_bytes = detections.nbytes
+                        if result is not None:
+                            cached_bytes += result.orig_img.nbytes
+                        result_cache.put(inspection_key, cached, cached_bytes)
                     
-                    # Enhance image if selected
-                    if enhance:
-                        pil_image = Image.fromarray(image_np)
-                        enhancer = ImageEnhance.Sharpness(pil_image)
-                        pil_image = enhancer.enhance(1.5)
-                        enhancer = ImageEnhance.Contrast(pil_image)
-                        pil_image = enhancer.enhance(1.2)
-                        image_np = np.array(pil_image)
+                    # Session state keeps arrays and settings; the frame goes to the bounded artifact store
+                    frame = cached['result'].orig_img if cached['result'] is not None else None
+                    st.session_state.current_results = dict(
+                        {k: v for k, v in cached.items() if k != 'result'}, key=inspection_key,
+                        image_name=uploaded_file.name, tiling=tiling, enhance=enhance, thumbnail=None,
+                        frame_scale=frame.shape[1] / image_info['size'][0] if frame is not None else None)
+                    if frame is not None:
+                        artifact_store.put(st.session_state.session_id, inspection_key, frame, frame.nbytes)
+                    del frame
                     
-                    results = model(image_np, conf=confidence)
-                    st.session_state.current_results = results
+                    # Save to history
+                    progress_bar.progress(*INSPECTION_STAGES['report'])
+                    with instrumentation.stage('report'):
+                        inspection = build_inspection(image_info['size'], uploaded_file.name, None, model.names,
+                                                      cached['detections'].filter(confidence))
+                    inspection['duplicate'] = match is not None
+                    history_store.add(history_record(inspection))
+                    progress_bar.progress(1.0, text="✅ Inspection complete")
+            
+            current = st.session_state.current_results
+            if current is not None and current['key'] == inspection_key and model is not None:
+                # Re-threshold the stored detections for the current slider value
+                mask = current['detections'].mask(confidence)
+                detections = current['detections'][mask]
+                inspection = build_inspection(image_info['size'], uploaded_file.name, None, model.names, detections)
+                gate = current.get('gate')
+                if gate is not None and gate['verdict'] == 'unchanged':
+                    st.success("🥇 Matches the golden reference - passed without running the model.")
+                elif gate is not None and gate['verdict'] == 'roi':
+                    st.info(f"🥇 {len(gate['rois'])} changed region(s) inspected - "
+                            f"{gate['inferred_fraction']:.1%} of the frame went through the model.")
+                elif gate is not None:
+                    st.info(f"🥇 Frame differs from the golden reference ({gate.get('reason', 'changed')}) - "
+                            "inspected in full.")
+                if current.get('duplicate_of'):
+                    match_kind = ("Resubmission" if not current['hash_distance']
+                                  else f"Near-duplicate ({current['hash_distance']} bits apart)")
+                    st.info(f"♻️ {match_kind} of **{current['duplicate_of']}** - "
+                            "its detections were reused without running the model.")
+                
+                if current['frame_scale'] is not None:
+                    frame = artifact_store.get(st.session_state.session_id, inspection_key)
+                    if frame is None:
+                        with instrumentation.stage('rebuild frame'):
+                            frame = rebuild_frame(upload_bytes, image_info, current['enhance'], current['tiling'])
+                        artifact_store.put(st.session_state.session_id, inspection_key, frame, frame.nbytes)
+                    # Enhanced Results, drawn at display resolution; one array serves display, thumbnail and export
+                    with instrumentation.stage('render'):
+                        from annotate import render_detections
+                        result_img_rgb = render_detections(frame, detections.rescale(current['frame_scale']), model.names)
+                    del frame
+                    if current['thumbnail'] is None:
+                        current['thumbnail'] = make_thumbnail(result_img_rgb)
+                        current['status'] = inspection['status']
                     
-                    if len(results) > 0:
-                        # Enhanced Results
-                        result_img = results[0].plot()
-                        result_img_rgb = cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB)
-                        st.session_state.processed_image = Image.fromarray(result_img_rgb)
-                        
-                        st.image(result_img_rgb, use_container_width=True, caption="🎯 AI DEFECT MAPPING")
-                        
-                        # Download buttons
-                        st.markdown("#### 💾 Export Results")
-                        col_d1, col_d2 = st.columns(2)
-                        
-                        with col_d1:
-                            st.markdown(get_image_download_link(
-                                Image.fromarray(result_img_rgb), 
-                                "defect_analysis.png", 
-                                "📥 Download Analysis Image"
-                            ), unsafe_allow_html=True)
-                        
-                        with col_d2:
-                            # Create a simple report
-                            report_text = f"AlfaStack AI Inspector Report\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                            report_text += f"Image: {uploaded_file.name}\nDimensions: {image.size[0]}x{image.size[1]}\n\n"
-                            
-                            defect_count = len(results[0].boxes)
-                            report_text += f"Defects Detected: {defect_count}\n"
-                            
-                            if defect_count > 0:
-                                report_text += "\nDefect Details:\n"
-                                for i, box in enumerate(results[0].boxes):
-                                    class_id = int(box.cls[0])
-                                    class_name = model.names[class_id]
-                                    conf = box.conf[0].item()
-                                    report_text += f"{i+1}. {class_name.upper()} (Confidence: {conf:.1%})\n"
-                            
-                            # Create download link for report
-                            b64_report = base64.b64encode(report_text.encode()).decode()
-                            href = f'<a href="data:file/txt;base64,{b64_report}" download="inspection_report.txt" style="background: linear-gradient(45deg, #10b981, #059669); color: white; padding: 0.5rem 1rem; text-decoration: none; border-radius: 8px; display: inline-block; margin: 0.5rem;">📥 Download Report</a>'
-                            st.markdown(href, unsafe_allow_html=True)
-                        
-                        # Enterprise Metrics
-                        defect_count = len(results[0].boxes)
-                        objects_data = []
-                        
-                        for i, box in enumerate(results[0].boxes):
-                            class_id = int(box.cls[0])
-                            class_name = model.names[class_id]
-                            conf = box.conf[0].item()
-                            x1, y1, x2, y2 = box.xyxy[0].tolist()
-                            
-                            # Advanced measurements
-                            width = x2 - x1
-                            height = y2 - y1
-                            area = width * height
-                            aspect_ratio = width / height if height > 0 else 0
-                            
-                            objects_data.append({
-                                'Defect ID': i+1,
-                                'Type': class_name.upper(),
-                                'Confidence': f"{conf:.1%}",
-                                'Width': f"{width:.1f}px",
-                                'Height': f"{height:.1f}px",
-                                'Area': f"{area:.1f}px²",
-                                'Aspect Ratio': f"{aspect_ratio:.2f}"
-                            })
-                        
-                        # Display Analysis
-                        st.markdown("#### 📊 Detailed Analysis Report")
-                        df = pd.DataFrame(objects_data)
-                        st.dataframe(df, use_container_width=True, height=300)
-                        
-                        # Key Metrics
-                        st.markdown("#### 📈 Inspection Summary")
-                        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-                        
-                        with col_m1:
-                            st.markdown(f'<div class="metric-card"><h4>DEFECTS</h4><h2>{defect_count}</h2></div>', unsafe_allow_html=True)
-                        
-                        with col_m2:
-                            avg_conf = np.mean([box.conf[0].item() for box in results[0].boxes]) if defect_count > 0 else 0
-                            st.markdown(f'<div class="metric-card"><h4>CONFIDENCE</h4><h2>{avg_conf:.1%}</h2></div>', unsafe_allow_html=True)
-                        
-                        with col_m3:
-                            total_area = sum([(box.xyxy[0][2] - box.xyxy[0][0]) * (box.xyxy[0][3] - box.xyxy[0][1]) for box in results[0].boxes])
-                            st.markdown(f'<div class="metric-card"><h4>TOTAL AREA</h4><h2>{total_area:.0f} px²</h2></div>', unsafe_allow_html=True)
-                        
-                        with col_m4:
-                            status = "❌ REJECT" if defect_count > 0 else "✅ PASS"
-                            st.markdown(f'<div class="metric-card"><h4>VERDICT</h4><h2>{status}</h2></div>', unsafe_allow_html=True)
-                        
-                        # Save to history
-                        st.session_state.analysis_history.append({
-                            'timestamp': datetime.now(),
-                            'defects': defect_count,
-                            'confidence': avg_conf,
-                            'status': status,
-                            'image_name': uploaded_file.name
-                        })
-                        
-                    else:
-                        # Perfect Quality
-                        st.session_state.processed_image = image
-                        st.success("🎉 **MANUFACTURING EXCELLENCE ACHIEVED**")
-                        st.balloons()
-                        st.markdown('''
-                        <div class="success-message">
-                            <h2 style="color: white; margin: 0;">✅ QUALITY CERTIFIED</h2>
-                            <p style="color: white; font-size: 1.2rem;">Zero Defects • Production Ready • Market Perfect</p>
-                        </div>
-                        ''', unsafe_allow_html=True)
-                        
-                        # Save to history
-                        st.session_state.analysis_history.append({
-                            'timestamp': datetime.now(),
-                            'defects': 0,
-                            'confidence': 1.0,
-                            'status': 'PASS',
-                            'image_name': uploaded_file.name
-                        })
+                    st.image(result_img_rgb, use_container_width=True, caption="🎯 AI DEFECT MAPPING")
+                    if 'tiles' in current['timings']:
+                        stage_times = current['timings']
+                        st.caption(f"🧩 {stage_times['tiles']} tiles • slice {stage_times['slice'] * 1000:.0f} ms • "
+                                   f"inference {stage_times['inference'] * 1000:.0f} ms • merge {stage_times['merge'] * 1000:.0f} ms")
+                    
+                    # Download buttons
+                    st.markdown("#### 💾 Export Results")
+                    col_d1, col_d2 = st.columns(2)
+                    
+                    with col_d1:
+                        # Encoded only when the download is clicked
+                        image_format = st.selectbox("Image Format", list(IMAGE_FORMATS))
+                        image_quality = st.slider("Image Quality", 50, 100, 90, disabled=image_format == "PNG")
+                        extension, mime = IMAGE_FORMATS[image_format]
+                        st.download_button(
+                            "📥 Download Analysis Image",
+                            data=partial(encode_annotated, f"{inspection_key}:{confidence:.4f}", image_format,
+                                         image_quality, result_img_rgb),
+                            file_name=f"defect_analysis.{extension}",
+                            mime=mime,
+                            on_click="ignore",
+                            use_container_width=True
+                        )
+                    
+                    with col_d2:
+                        st.download_button(
+                            "📥 Download Report",
+                            data=inspection['report'],
+                            file_name="inspection_report.txt",
+                            mime="text/plain",
+                            on_click="ignore",
+                            use_container_width=True
+                        )
+                    
+                    # Enterprise Metrics
+                    defect_count = inspection['defects']
+                    
+                    # Display Analysis
+                    st.markdown("#### 📊 Detailed Analysis Report")
+                    df = pd.DataFrame(detections.table(model.names))
+                    st.dataframe(df, use_container_width=True, height=300)
+                    
+                    # Key Metrics
+                    st.markdown("#### 📈 Inspection Summary")
+                    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+                    
+                    with col_m1:
+                        st.markdown(f'<div class="metric-card"><h4>DEFECTS</h4><h2>{defect_count}</h2></div>', unsafe_allow_html=True)
+                    
+                    with col_m2:
+                        avg_conf = inspection['confidence']
+                        st.markdown(f'<div class="metric-card"><h4>CONFIDENCE</h4><h2>{avg_conf:.1%}</h2></div>', unsafe_allow_html=True)
+                    
+                    with col_m3:
+                        total_area = inspection['total_area']
+                        st.markdown(f'<div class="metric-card"><h4>TOTAL AREA</h4><h2>{total_area:.0f} px²</h2></div>', unsafe_allow_html=True)
+                    
+                    with col_m4:
+                        status = inspection['status']
+                        st.markdown(f'<div class="metric-card"><h4>VERDICT</h4><h2>{status}</h2></div>', unsafe_allow_html=True)
+                
+                else:
+                    # Perfect Quality
+                    st.success("🎉 **MANUFACTURING EXCELLENCE ACHIEVED**")
+                    st.balloons()
+                    st.markdown('''
+                    <div class="success-message">
+                        <h2 style="color: white; margin: 0;">✅ QUALITY CERTIFIED</h2>
+                        <p style="color: white; font-size: 1.2rem;">Zero Defects • Production Ready • Market Perfect</p>
+                    </div>
+                    ''', unsafe_allow_html=True)
         else:
+            last = st.session_state.current_results
+            if last is not None and last['thumbnail'] is not None:
+                st.image(last['thumbnail'], caption=f"🕘 Last inspection: {last['image_name']} • {last['status']}")
             st.info("""
             👆 **UPLOAD MANUFACTURING SAMPLE FOR AI ANALYSIS**
             
@@ -423,50 +679,220 @@ with tab1:
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+    # Batch Inspection
+    st.markdown('<div class="enterprise-card">', unsafe_allow_html=True)
+    st.markdown("### 📦 Batch Inspection")
+    batch_files = st.file_uploader(
+        "**📦 UPLOAD A BATCH OF SAMPLES**",
+        type=['jpg', 'jpeg', 'png', 'bmp'],
+        accept_multiple_files=True,
+        key="batch_uploader"
+    )
+    
+    if batch_files:
+        col_b1, col_b2, col_b3 = st.columns(3)
+        with col_b1:
+            batch_confidence = st.slider("Batch AI Confidence", 0.1, 1.0, 0.6, 0.05)
+        with col_b2:
+            batch_size = st.slider("Inference Batch Size", 1, 32, 8)
+        with col_b3:
+            batch_enhance = st.checkbox("Enhance Batch Images", value=True)
+        
+        if st.button(f"🚀 INSPECT {len(batch_files)} SAMPLES", use_container_width=True, type="primary",
+                     disabled=model is None):
+            progress_bar = st.progress(0)
+            named_images = iter_batch_uploads(batch_files)
+            batch_results = []
+            batch_start = time.perf_counter()
+            batch_duplicates = duplicate_scope(batch_confidence, batch_enhance)
+            from annotate import render_detections
+            try:
+                for inspection in inspect_batch(model, named_images, batch_confidence, batch_enhance, batch_size,
+                                                batch_duplicates, reference_gate):
+                    # Only the summary and a small JPEG thumbnail outlive the loop; the frame is released here
+                    result = inspection.pop('results')[0]
+                    thumb = encode_image(render_detections(result.orig_img, Detections.from_result(result),
+                                                           model.names, 320), "JPEG", 85)
+                    del result
+                    batch_results.append((inspection, thumb))
+                    progress_bar.progress(len(batch_results) / len(batch_files))
+            except PoolUnavailable as e:
+                # Keep what finished before the pool went away
+                st.error(f"❌ {e} - {len(batch_results)} of {len(batch_files)} samples were inspected.")
+            batch_elapsed = time.perf_counter() - batch_start
+            model_registry.record_latency(model_id, batch_elapsed, len(batch_results))
+            if batch_results:
+                instrumentation.record('batch (per image)', batch_elapsed / len(batch_results))
+            
+            # Save every result to history in one step
+            history_store.add_many(history_record(insp) for insp, _ in batch_results)
+            
+            # Aggregate Verdict
+            rejected = sum(1 for insp, _ in batch_results if insp['defects'] > 0)
+            col_g1, col_g2, col_g3, col_g4 = st.columns(4)
+            with col_g1:
+                st.markdown(f'<div class="metric-card"><h4>SAMPLES</h4><h2>{len(batch_results)}</h2></div>', unsafe_allow_html=True)
+            with col_g2:
+                st.markdown(f'<div class="metric-card"><h4>REJECTED</h4><h2>{rejected}</h2></div>', unsafe_allow_html=True)
+            with col_g3:
+                batch_pass_rate = (len(batch_results) - rejected) / len(batch_results) if batch_results else 0
+                st.markdown(f'<div class="metric-card"><h4>PASS RATE</h4><h2>{batch_pass_rate:.1%}</h2></div>', unsafe_allow_html=True)
+            with col_g4:
+                batch_status = get_verdict(rejected)
+                st.markdown(f'<div class="metric-card"><h4>BATCH VERDICT</h4><h2>{batch_status}</h2></div>', unsafe_allow_html=True)
+            
+            # Per-image Result Grid
+            st.markdown("#### 🧩 Per-Image Results")
+            grid_cols = st.columns(4)
+            for i, (insp, thumb) in enumerate(batch_results):
+                with grid_cols[i % 4]:
+                    note = f" • ♻️ {insp['duplicate_of']}" if insp.get('duplicate') else ""
+                    if insp.get('gate'):
+                        note += f" • 🥇 {insp['gate']['verdict']}"
+                    st.image(thumb, use_container_width=True,
+                             caption=f"{insp['image_name']} • {insp['status']} • {insp['defects']} defects{note}")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Stream Inspection
+    st.markdown('<div class="enterprise-card">', unsafe_allow_html=True)
+    st.markdown("### 🎥 Video & Camera Stream Inspection")
+    from video_stream import VIDEO_EXTENSIONS, inspect_video
+    col_v1, col_v2 = st.columns(2)
+    with col_v1:
+        video_file = st.file_uploader("**🎥 UPLOAD A VIDEO**", type=list(VIDEO_EXTENSIONS), key="video_uploader")
+    with col_v2:
+        stream_url = st.text_input("...or Camera Source", placeholder="rtsp://camera/stream or 0 for /dev/video0",
+                                   key="stream_url")
+    
+    if video_file or stream_url:
+        col_s1, col_s2, col_s3, col_s4 = st.columns(4)
+        with col_s1:
+            stream_confidence = st.slider("Stream AI Confidence", 0.1, 1.0, 0.6, 0.05)
+        with col_s2:
+            stream_batch = st.slider("Frames per Batch", 1, 16, 4)
+        with col_s3:
+            max_frames = st.number_input("Max Frames (0 = all)", 0, 100000, 0 if video_file else 300, 50)
+        with col_s4:
+            realtime = st.checkbox("Keep Up with Real Time", value=True,
+                                   help="Skip and drop frames so inspection runs at the source frame rate")
+            stream_enhance = st.checkbox("Enhance Stream Frames", value=True)
+        
+        if st.button("🎬 INSPECT STREAM", use_container_width=True, type="primary", disabled=model is None):
+            if video_file:
+                # OpenCV reads from a path, so the upload is spooled to disk for the run
+                suffix = os.path.splitext(video_file.name)[1]
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                    tmp.write(video_file.getvalue())
+                source, source_name = tmp.name, video_file.name
+            else:
+                source, source_name = stream_url.strip(), stream_url.strip()
+            
+            frame_view = st.empty()
+            stream_metrics = st.empty()
+            stream_stats = {}
+            pending, rejected, inspected, reused_frames = [], 0, 0, 0
+            last_paint = 0.0
+            
+            def show_stream_metrics():
+                col_m1, col_m2, col_m3, col_m4, col_m5 = stream_metrics.container().columns(5)
+                col_m1.metric("Frames Inspected", inspected, help=f"{reused_frames} reused from duplicate frames")
+                col_m2.metric("Rejected", rejected)
+                col_m3.metric("Achieved FPS", f"{stream_stats.get('fps', 0):.1f}",
+                              help=f"Source: {stream_stats.get('source_fps', 0):.1f} fps")
+                col_m4.metric("Skipped • Dropped", f"{stream_stats.get('skipped', 0)} • {stream_stats.get('dropped', 0)}")
+                col_m5.metric("Skip Stride", f"1/{stream_stats.get('stride', 1)}")
+            
+            try:
+                from annotate import render_detections
+                stream_start = time.perf_counter()
+                for inspection in inspect_video(model, source, stream_confidence, stream_enhance, stream_batch,
+                                                realtime, max_frames or None, source_name, stream_stats,
+                                                duplicate_scope(stream_confidence, stream_enhance), reference_gate):
+                    inspected += 1
+                    reused_frames += inspection.get('duplicate', False)
+                    rejected += inspection['defects'] > 0
+                    pending.append(history_record(inspection))
+                    # Repaint a few times a second; drawing every frame would slow the stream down
+                    if time.perf_counter() - last_paint > 0.25:
+                        result = inspection['results'][0]
+                        frame_view.image(render_detections(result.orig_img, Detections.from_result(result), model.names, 960),
+                                         use_container_width=True,
+                                         caption=f"Frame {inspection['frame_index']} • {inspection['position']:.1f}s • "
+                                                 f"{inspection['status']} • {inspection['defects']} defects")
+                        show_stream_metrics()
+                        last_paint = time.perf_counter()
+                    if len(pending) >= 32:
+                        history_store.add_many(pending)
+                        pending = []
+                show_stream_metrics()
+                if inspected:
+                    instrumentation.record('stream (per frame)', (time.perf_counter() - stream_start) / inspected)
+                if stream_stats.get('error'):
+                    st.warning(f"⚠️ Stream ended early: {stream_stats['error']}")
+                st.success(f"✅ Inspected {inspected} frames of {source_name} - {rejected} rejected, "
+                           f"{reused_frames} duplicates reused, {stream_stats.get('skipped', 0)} skipped, "
+                           f"{stream_stats.get('dropped', 0)} dropped")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            except PoolUnavailable as e:
+                st.error(f"❌ {e} - stream stopped after {inspected} frames.")
+            finally:
+                # Frames inspected before any failure still belong in the history
+                history_store.add_many(pending)
+                if video_file:
+                    os.unlink(source)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
 with tab2:
     st.markdown('<div class="enterprise-card">', unsafe_allow_html=True)
     st.markdown("### 📈 Quality Analytics Dashboard")
     
-    if st.session_state.analysis_history:
-        history_df = pd.DataFrame(st.session_state.analysis_history)
-        
+    summary = history_store.summary()
+    if summary['total']:
         # Summary Metrics
         st.markdown("#### 📊 Inspection Summary")
         col_s1, col_s2, col_s3, col_s4 = st.columns(4)
         
         with col_s1:
-            total_inspections = len(history_df)
-            st.metric("Total Inspections", total_inspections)
+            st.metric("Total Inspections", summary['total'])
         
         with col_s2:
-            pass_rate = len(history_df[history_df['defects'] == 0]) / total_inspections * 100
-            st.metric("Pass Rate", f"{pass_rate:.1f}%")
+            st.metric("Pass Rate", f"{summary['pass_rate']:.1f}%")
         
         with col_s3:
-            avg_defects = history_df['defects'].mean()
-            st.metric("Avg Defects/Image", f"{avg_defects:.1f}")
+            st.metric("Avg Defects/Image", f"{summary['avg_defects']:.1f}")
         
         with col_s4:
-            avg_confidence = history_df['confidence'].mean()
-            st.metric("Avg Confidence", f"{avg_confidence:.1%}")
+            st.metric("Avg Confidence", f"{summary['avg_confidence']:.1%}")
         
-        # Charts
+        # Charts read a time window, bucketed in SQLite so the payload size is fixed
+        window = st.selectbox("Time Window", list(HISTORY_WINDOWS), index=1)
+        since = datetime.now() - HISTORY_WINDOWS[window] if HISTORY_WINDOWS[window] else None
         col_c1, col_c2 = st.columns(2)
         
         with col_c1:
             # Defect Trend
-            fig_trend = px.line(history_df, x='timestamp', y='defects', 
-                               title='Defect Trend Analysis', markers=True)
-            fig_trend.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white'
-            )
-            st.plotly_chart(fig_trend, use_container_width=True)
+            trend_df = pd.DataFrame(history_store.trend(since))
+            if trend_df.empty:
+                st.info(f"No inspections in the {window.lower()}.")
+            else:
+                trend_df = trend_df.rename(columns={'mean': 'Mean', 'max': 'Max', 'min': 'Min'})
+                fig_trend = px.line(trend_df, x='timestamp', y=['Mean', 'Max', 'Min'],
+                                   title='Defect Trend Analysis', markers=True,
+                                   hover_data=['inspections'],
+                                   labels={'value': 'defects', 'variable': ''})
+                fig_trend.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+                st.plotly_chart(fig_trend, use_container_width=True)
         
         with col_c2:
             # Status Distribution
-            status_counts = history_df['status'].value_counts()
+            status_counts = pd.Series(summary['status_counts'])
             fig_pie = px.pie(
                 values=status_counts.values, 
                 names=status_counts.index,
@@ -483,23 +909,38 @@ with tab2:
         
         # Recent Inspections Table
         st.markdown("#### 📋 Recent Inspections")
-        display_df = history_df.copy()
-        display_df['timestamp'] = display_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
+        window_total = history_store.count(since)
+        col_p1, col_p2 = st.columns(2)
+        with col_p1:
+            page_size = st.selectbox("Rows per Page", [25, 50, 100], index=1)
+        with col_p2:
+            pages = max(1, -(-window_total // page_size))
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+        display_df = pd.DataFrame(history_store.recent(page_size, (page - 1) * page_size, since),
+                                  columns=['timestamp', 'defects', 'confidence', 'status', 'image_name', 'duplicate'])
+        display_df['timestamp'] = pd.to_datetime(display_df['timestamp']).dt.strftime('%Y-%m-%d %H:%M')
         display_df = display_df.rename(columns={
             'timestamp': 'Time',
             'defects': 'Defects',
             'confidence': 'Confidence',
             'status': 'Status',
-            'image_name': 'Image'
+            'image_name': 'Image',
+            'duplicate': 'Duplicate'
         })
-        st.dataframe(display_df.sort_values('Time', ascending=False), use_container_width=True)
+        st.dataframe(display_df, use_container_width=True)
         
         # Export Analytics
         st.markdown("#### 📤 Export Analytics")
-        csv = history_df.to_csv(index=False)
-        b64_csv = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64_csv}" download="inspection_analytics.csv" style="background: linear-gradient(45deg, #8b5cf6, #7c3aed); color: white; padding: 0.7rem 1.5rem; text-decoration: none; border-radius: 8px; display: inline-block; margin: 0.5rem; font-weight: 600;">📊 Download Full Analytics</a>'
-        st.markdown(href, unsafe_allow_html=True)
+        # Streamed from the store in chunks when the download is clicked
+        export_format = st.selectbox("Export Format", list(HISTORY_FORMATS))
+        extension, mime = HISTORY_FORMATS[export_format]
+        st.download_button(
+            "📊 Download Full Analytics",
+            data=partial(export_history, history_store, export_format),
+            file_name=f"inspection_analytics.{extension}",
+            mime=mime,
+            on_click="ignore"
+        )
     
     else:
         st.info("No inspection data available. Perform inspections to see analytics here.")
@@ -516,9 +957,65 @@ with tab3:
         st.markdown("#### AI Model Configuration")
         model_option = st.selectbox(
             "Detection Model",
-            ["YOLOv8 Nano (Default)", "YOLOv8 Small", "YOLOv8 Medium", "YOLOv8 Large"],
+            list(MODEL_CATALOG),
+            key="model_option",
             help="Select the AI model for detection. Larger models are more accurate but slower."
         )
+        col_be1, col_be2 = st.columns(2)
+        with col_be1:
+            st.selectbox(
+                "Inference Backend",
+                list(BACKENDS),
+                key="inference_backend",
+                help="Exported ONNX backends are usually faster on CPU-only instances; INT8 trades a little accuracy for speed."
+            )
+        with col_be2:
+            st.slider("Inference Threads (0 = auto)", 0, 16, 0, key="inference_threads")
+        pool_workers = st.slider("Inference Worker Processes (0 = in-process)", 0, os.cpu_count() or 1,
+                                 pool_manager.workers,
+                                 help="Server-wide: each worker loads the selected model with its own share of the cores.")
+        if pool_workers != pool_manager.workers:
+            pool_manager.configure(model_weights, inference_backend, pool_workers)
+            st.rerun()
+        if pool_manager.pool is not None and pool_manager.pool.error is not None:
+            st.error(f"❌ Worker pool failed: {pool_manager.pool.error}")
+            if st.button("🔁 Restart Worker Pool", use_container_width=True):
+                pool_manager.configure(pool_manager.pool.weights, pool_manager.pool.backend, pool_manager.workers)
+                st.rerun()
+        if pool_manager.pool is not None and worker_pool is None:
+            st.caption(f"The worker pool serves {pool_manager.pool.weights} ({pool_manager.pool.backend}); "
+                       "this station runs its own selection in-process.")
+        if worker_pool is not None:
+            pool_stats = worker_pool.stats()
+            col_wp1, col_wp2, col_wp3, col_wp4 = st.columns(4)
+            with col_wp1:
+                st.metric("Workers Ready", f"{pool_stats['ready']}/{pool_stats['workers']}")
+            with col_wp2:
+                st.metric("In Flight • Queued", f"{pool_stats['in_flight']} • {pool_stats['queued']}")
+            with col_wp3:
+                st.metric("Queue Wait p50/p95", f"{pool_stats['queue_wait_p50_ms']:.0f}/{pool_stats['queue_wait_p95_ms']:.0f} ms")
+            with col_wp4:
+                st.metric("Throughput", f"{pool_stats['throughput_ips']:.1f} img/s")
+        st.dataframe(pd.DataFrame(model_registry.stats()), use_container_width=True, hide_index=True)
+        
+        if inference_backend != DEFAULT_BACKEND:
+            samples = batch_files or ([uploaded_file] if uploaded_file else [])
+            if st.button(f"⚖️ Compare with PyTorch on {len(samples)} samples", use_container_width=True,
+                         disabled=not samples or model is None):
+                with st.spinner("Running side-by-side comparison..."):
+                    from backends import compare_backends
+                    baseline = load_model(model_weights, DEFAULT_BACKEND, inference_threads)
+                    sample_arrays = [prepare_image(image)[0] for _, image, *_ in iter_batch_uploads(samples)]
+                    comparison = compare_backends(baseline, model, sample_arrays, FLOOR_CONFIDENCE)
+                col_cmp1, col_cmp2, col_cmp3 = st.columns(3)
+                with col_cmp1:
+                    st.metric("PyTorch Latency", f"{comparison['baseline_ms']:.1f} ms")
+                with col_cmp2:
+                    st.metric(f"{st.session_state.inference_backend} Latency", f"{comparison['candidate_ms']:.1f} ms",
+                              f"{comparison['speedup']:.2f}x")
+                with col_cmp3:
+                    st.metric("Detection Agreement", f"{comparison['agreement']:.1%}",
+                              f"min {comparison['min_agreement']:.1%}", delta_color="off")
         
         st.markdown("#### Image Processing")
         col_set_a, col_set_b = st.columns(2)
@@ -527,15 +1024,157 @@ with tab3:
         with col_set_b:
             save_original = st.checkbox("Save original images", value=False)
         
+        st.markdown("#### Golden Reference")
+        from golden_reference import DEFAULT_GATE
+        reference_library = get_reference_library()
+        reference_products = reference_library.products()
+        st.selectbox("Active Reference (fixed fixture)", ["None"] + reference_products, key="golden_reference",
+                     help="Images matching the reference pass without inference; only changed regions are inspected.")
+        col_gr1, col_gr2 = st.columns(2)
+        with col_gr1:
+            st.slider("Pixel Tolerance (grey levels)", 5, 100, DEFAULT_GATE['pixel_tolerance'], key="gate_pixel_tolerance")
+        with col_gr2:
+            st.slider("Changed Area Tolerance (%)", 0.0, 1.0, DEFAULT_GATE['area_tolerance'] * 100, 0.01,
+                      key="gate_area_tolerance", format="%.2f")
+        with st.expander("Register a Reference"):
+            reference_name = st.text_input("Product Name", key="reference_name")
+            reference_upload = st.file_uploader("Known-good image", type=['jpg', 'jpeg', 'png', 'bmp'],
+                                                key="reference_uploader")
+            if st.button("🥇 Register Reference", use_container_width=True,
+                         disabled=not (reference_name and reference_upload)):
+                # Stored at inference resolution, the scale inspection images are gated at
+                reference_data = reference_upload.getvalue()
+                try:
+                    reference_image, _ = decode_for_inference(reference_data, probe_image(reference_data),
+                                                              INFERENCE_SIZE)
+                except (ImageTooLarge, OSError) as e:
+                    st.error(f"🚫 {reference_upload.name}: {e}")
+                else:
+                    # Rerun so the new product shows up in the reference selector above
+                    st.session_state.registered_reference = reference_library.register(reference_name,
+                                                                                       reference_image)
+                    st.rerun()
+            if 'registered_reference' in st.session_state:
+                st.success(f"Reference registered for **{st.session_state.pop('registered_reference')}**.")
+            if reference_products:
+                removed = st.selectbox("Remove Reference", reference_products, key="reference_remove")
+                if st.button("Remove", use_container_width=True):
+                    reference_library.remove(removed)
+                    st.rerun()
+        gate_stats = reference_library.stats()
+        col_gr3, col_gr4, col_gr5, col_gr6 = st.columns(4)
+        with col_gr3:
+            st.metric("Frames Gated", gate_stats['frames'])
+        with col_gr4:
+            st.metric("Unchanged • ROI • Full", f"{gate_stats['unchanged']} • {gate_stats['roi']} • {gate_stats['full']}")
+        with col_gr5:
+            st.metric("Inferences Avoided", f"{gate_stats['inferences_avoided']:.1%}")
+        with col_gr6:
+            st.metric("Pixels Avoided", f"{gate_stats['pixels_avoided']:.1%}",
+                      help="Share of gated frame area that never went through the model")
+        
         st.markdown("#### Notifications")
         email_alerts = st.checkbox("Email alerts for critical defects")
         if email_alerts:
             email_address = st.text_input("Email address")
         
+        st.markdown("#### Result Cache")
+        cache_stats = result_cache.stats()
+        col_rc1, col_rc2, col_rc3, col_rc4 = st.columns(4)
+        with col_rc1:
+            st.metric("Cache Hits", cache_stats['hits'])
+        with col_rc2:
+            st.metric("Cache Misses", cache_stats['misses'])
+        with col_rc3:
+            st.metric("Hit Rate", f"{cache_stats['hit_rate']:.1%}")
+        with col_rc4:
+            st.metric("Cached", f"{cache_stats['entries']} • {cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+        if st.button("Clear Result Cache", use_container_width=True):
+            result_cache.clear()
+            st.success("Result cache cleared!")
+        
+        st.markdown("#### Duplicate Reuse")
+        from dedup_index import FUZZY_MAX_DISTANCE
+        duplicate_index = get_duplicate_index()
+        col_dd1, col_dd2 = st.columns(2)
+        with col_dd1:
+            st.checkbox("Reuse results for resubmitted images", value=False, key="dedup_enabled",
+                        help="An identical file (or identical video frame) inspected before with the same model "
+                             "and settings reuses its detections instead of running the model.")
+            st.checkbox("Also match near-duplicates (fuzzy)", value=False, key="dedup_fuzzy",
+                        disabled=not st.session_state.get('dedup_enabled', False),
+                        help="Reuse results of perceptually similar images. A small defect changes only a few "
+                             "hash bits, so a defective part can inherit a clean part's PASS.")
+        with col_dd2:
+            st.slider("Max Hash Distance (bits of 64)", 1, 16, FUZZY_MAX_DISTANCE, key="dedup_distance",
+                      disabled=not (st.session_state.get('dedup_enabled', False)
+                                    and st.session_state.get('dedup_fuzzy', False)),
+                      help="Fuzzy matching only. A 10x10 px defect on a 1440x1080 part is about 2 bits.")
+            if st.session_state.get('dedup_enabled', False) and st.session_state.get('dedup_fuzzy', False):
+                st.warning("⚠️ Fuzzy reuse can pass defective parts that look like a recent clean one.")
+        dedup_stats = duplicate_index.stats()
+        col_dd3, col_dd4, col_dd5, col_dd6 = st.columns(4)
+        with col_dd3:
+            st.metric("Duplicate Hits", dedup_stats['hits'])
+        with col_dd4:
+            st.metric("Lookups Missed", dedup_stats['misses'])
+        with col_dd5:
+            st.metric("Duplicate Hit Rate", f"{dedup_stats['hit_rate']:.1%}")
+        with col_dd6:
+            st.metric("Indexed Images", f"{dedup_stats['entries']}/{dedup_stats['max_entries']}",
+                      help=f"{dedup_stats['evictions']} evicted")
+        if st.button("Clear Duplicate Index", use_container_width=True):
+            duplicate_index.clear()
+            st.success("Duplicate index cleared!")
+        
+        st.markdown("#### Session Memory")
+        state_sizes = session_state_nbytes(st.session_state)
+        artifact_stats = artifact_store.stats()
+        session_artifacts = artifact_store.session_bytes(st.session_state.session_id)
+        col_sm1, col_sm2, col_sm3, col_sm4 = st.columns(4)
+        with col_sm1:
+            st.metric("Session State", f"{sum(state_sizes.values()) / 1024:.0f} KB")
+        with col_sm2:
+            st.metric("Session Artifacts", f"{session_artifacts / 1024 / 1024:.1f} / "
+                                           f"{artifact_stats['session_budget'] / 1024 / 1024:.0f} MB")
+        with col_sm3:
+            st.metric("All Sessions", f"{artifact_stats['bytes'] / 1024 / 1024:.1f} / "
+                                      f"{artifact_stats['global_budget'] / 1024 / 1024:.0f} MB",
+                      help=f"{artifact_stats['entries']} artifacts across {artifact_stats['sessions']} sessions")
+        with col_sm4:
+            st.metric("Artifact Evictions", artifact_stats['evictions'],
+                      help=f"Artifact hit rate {artifact_stats['hit_rate']:.1%}; evicted frames are rebuilt "
+                           "from the upload without re-running the model.")
+        with st.expander("Session State by Key"):
+            st.dataframe(pd.DataFrame({'Key': list(state_sizes), 'KB': [round(n / 1024, 1) for n in state_sizes.values()]}),
+                         use_container_width=True, hide_index=True)
+        
+        st.markdown("#### Performance")
+        stage_stats = instrumentation.stats()
+        if stage_stats:
+            st.dataframe(pd.DataFrame(stage_stats), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No timings recorded yet. Run an inspection to populate the stage latencies.")
+        st.checkbox("Profile inspections with cProfile", key="profile_inspections",
+                    help="Runs the next uncached inspection under cProfile (slower while enabled).")
+        last_profile = st.session_state.get('last_profile')
+        if last_profile:
+            with st.expander(f"cProfile: {last_profile['image_name']}"):
+                st.code(last_profile['text'])
+            st.download_button("📥 Download Profile (.prof)", data=last_profile['data'],
+                               file_name="inspection.prof", mime="application/octet-stream",
+                               on_click="ignore", use_container_width=True)
+        if st.button("Reset Timings", use_container_width=True):
+            instrumentation.reset()
+            st.success("Stage timings reset!")
+        
         st.markdown("#### Data Management")
-        if st.button("Clear Inspection History", use_container_width=True):
-            st.session_state.analysis_history = []
-            st.success("Inspection history cleared!")
+        # The history is one persistent store shared by every station, so clearing it takes a confirmation
+        confirm_clear = st.checkbox("I understand this permanently deletes the history of all stations",
+                                    key="confirm_clear_history")
+        if st.button("🗑️ Clear Shared History (All Stations)", use_container_width=True, disabled=not confirm_clear):
+            history_store.clear()
+            st.success("Shared inspection history cleared for all stations!")
         
         st.markdown('</div>', unsafe_allow_html=True)
     
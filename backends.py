@@ -0,0 +1,291 @@
+"""CPU inference backends: exported ONNX (optionally INT8) run by ONNX Runtime or OpenVINO.
+
+Exported models are wrapped in ExportedYOLO, which is called like an ultralytics
+YOLO model (``model(image_np, conf=...)``) and returns ultralytics Results, so
+the engine, cache and UI work unchanged whichever backend is selected.
+
+Usage:
+    python backends.py compare /data/samples --weights yolov8n.pt --backend onnx-int8 --threads 4
+"""
+import ast
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detections import Detections
+
+BACKENDS = {
+    "PyTorch": "pytorch",
+    "ONNX Runtime": "onnx",
+    "ONNX Runtime INT8": "onnx-int8",
+    "OpenVINO": "openvino",
+}
+DEFAULT_BACKEND = "pytorch"
+DEFAULT_IMGSZ = 640
+
+
+def export_onnx(weights, imgsz=DEFAULT_IMGSZ):
+    """Export weights to ONNX once; later calls reuse the file on disk"""
+    onnx_path = os.path.splitext(weights)[0] + ".onnx"
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+        onnx_path = YOLO(weights).export(format="onnx", dynamic=True, imgsz=imgsz)
+    return onnx_path
+
+
+def quantize_int8(onnx_path):
+    """Dynamic (weight-only calibration free) INT8 quantization of an ONNX model"""
+    int8_path = os.path.splitext(onnx_path)[0] + ".int8.onnx"
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def _onnx_names(onnx_path):
+    import onnx
+    meta = {p.key: p.value for p in onnx.load(onnx_path, load_external_data=False).metadata_props}
+    return ast.literal_eval(meta['names']) if 'names' in meta else {}
+
+
+class _OrtRunner:
+    def __init__(self, onnx_path, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class _OpenVINORunner:
+    def __init__(self, onnx_path, threads=None):
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise ImportError("OpenVINO backend requires `pip install openvino`") from e
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = ov.Core().compile_model(onnx_path, "CPU", config)
+
+    def __call__(self, batch):
+        return self.compiled(batch)[0]
+
+
+def letterbox(image_np, imgsz=DEFAULT_IMGSZ, auto=False, stride=32):
+    """Resize keeping aspect ratio and pad (same as ultralytics LetterBox).
+
+    With auto=True padding only reaches the next stride multiple instead of a
+    full imgsz square, which is what the PyTorch path does for single images.
+    """
+    h, w = image_np.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = imgsz - new_w, imgsz - new_h
+    if auto:
+        pad_x, pad_y = pad_x % stride, pad_y % stride
+    pad_x, pad_y = pad_x / 2, pad_y / 2
+    if (new_w, new_h) != (w, h):
+        image_np = cv2.resize(image_np, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image_np = cv2.copyMakeBorder(image_np, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image_np, gain, (left, top)
+
+
+def nms(xyxy, scores, classes, iou_threshold, max_det=300, metric="iou"):
+    """Class-aware greedy NMS on NumPy arrays; returns kept indices.
+
+    metric="ios" divides the overlap by the smaller box instead of the union,
+    which also suppresses partial boxes clipped by a tile border.
+    """
+    if len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Offset boxes per class so one pass never suppresses across classes
+    offset = classes[:, None].astype(np.float32) * (xyxy.max() + 1)
+    boxes = xyxy + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores)
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        if metric == "ios":
+            overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        else:
+            overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class ExportedYOLO:
+    """Drop-in replacement for ``YOLO(...)`` backed by an exported ONNX graph"""
+
+    def __init__(self, onnx_path, runtime="onnx", threads=None, imgsz=DEFAULT_IMGSZ):
+        self.onnx_path = onnx_path
+        self.imgsz = imgsz
+        self.names = _onnx_names(onnx_path)
+        runner = _OpenVINORunner if runtime == "openvino" else _OrtRunner
+        self.runner = runner(onnx_path, threads)
+
+    def _postprocess(self, output, conf, iou, gain, pad, shape):
+        if output.shape[-1] == 6 and output.shape[0] <= 300:
+            # End-to-end export: rows are already x1, y1, x2, y2, score, class
+            rows = output[output[:, 4] >= conf]
+            xyxy, scores, classes = rows[:, :4].copy(), rows[:, 4], rows[:, 5].astype(np.int64)
+        else:
+            preds = output.T  # (anchors, 4 + classes)
+            class_scores = preds[:, 4:]
+            classes = class_scores.argmax(1)
+            scores = class_scores[np.arange(len(classes)), classes]
+            keep = scores >= conf
+            preds, scores, classes = preds[keep], scores[keep], classes[keep]
+            cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+            xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+            keep = nms(xyxy, scores, classes, iou)
+            xyxy, scores, classes = xyxy[keep], scores[keep], classes[keep]
+        xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / gain
+        xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / gain
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+        return Detections(xyxy, scores, classes)
+
+    def __call__(self, source, conf=0.25, iou=0.7, verbose=False, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        # Minimal stride padding when every frame has the same shape, full square otherwise
+        same_shape = len({image.shape for image in images}) == 1
+        boxed = [letterbox(image, self.imgsz, auto=same_shape) for image in images]
+        # Match ultralytics: numpy input is treated as BGR and flipped to RGB
+        batch = np.stack([b[0][..., ::-1] for b in boxed]).transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+        outputs = self.runner(batch)
+
+        results = []
+        for image, (_, gain, pad), output in zip(images, boxed, outputs):
+            dets = self._postprocess(output, conf, iou, gain, pad, image.shape)
+            results.append(dets.to_result(image, self.names))
+        return results
+
+
+def load_backend(weights, backend=DEFAULT_BACKEND, threads=None):
+    """Load weights for the requested backend (exports on first use)"""
+    if backend == "pytorch":
+        from inspector import load_yolo
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return load_yolo(weights)
+
+    onnx_path = export_onnx(weights)
+    if backend == "onnx-int8":
+        onnx_path = quantize_int8(onnx_path)
+    runtime = "openvino" if backend == "openvino" else "onnx"
+    return ExportedYOLO(onnx_path, runtime=runtime, threads=threads)
+
+
+# ---- Side-by-side comparison ----
+
+def _box_iou(a, b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def detection_agreement(baseline, candidate, iou_threshold=0.5):
+    """F1 of same-class matches at IoU >= threshold (1.0 when both are empty)"""
+    if len(baseline) == 0 and len(candidate) == 0:
+        return 1.0
+    if len(baseline) == 0 or len(candidate) == 0:
+        return 0.0
+    iou = _box_iou(baseline.xyxy, candidate.xyxy)
+    iou[baseline.cls[:, None] != candidate.cls[None, :]] = 0
+    matched = 0
+    while True:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        matched += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return 2 * matched / (len(baseline) + len(candidate))
+
+
+def compare_backends(baseline, candidate, images, confidence=0.25):
+    """Latency and detection agreement of a candidate backend against a baseline"""
+    latencies = {'baseline': [], 'candidate': []}
+    agreements = []
+    for image_np in images:
+        start = time.perf_counter()
+        base_result = baseline(image_np, conf=confidence, verbose=False)[0]
+        latencies['baseline'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cand_result = candidate(image_np, conf=confidence, verbose=False)[0]
+        latencies['candidate'].append(time.perf_counter() - start)
+        agreements.append(detection_agreement(Detections.from_result(base_result), Detections.from_result(cand_result)))
+
+    base_ms = float(np.mean(latencies['baseline'])) * 1000 if images else 0.0
+    cand_ms = float(np.mean(latencies['candidate'])) * 1000 if images else 0.0
+    return {
+        'images': len(images),
+        'baseline_ms': base_ms,
+        'candidate_ms': cand_ms,
+        'speedup': base_ms / cand_ms if cand_ms else 0.0,
+        'agreement': float(np.mean(agreements)) if agreements else 0.0,
+        'min_agreement': float(np.min(agreements)) if agreements else 0.0,
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    from inspector import DEFAULT_WEIGHTS, iter_decoded, iter_image_paths, prepare_image
+
+    parser = argparse.ArgumentParser(description="Compare an exported backend against PyTorch")
+    parser.add_argument("command", choices=["compare"])
+    parser.add_argument("target", help="Directory or glob pattern of sample images")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", default="onnx", choices=[b for b in BACKENDS.values() if b != "pytorch"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    images = []
+    for _, image, error in iter_decoded(iter_image_paths(args.target)):
+        if error is None:
+            images.append(prepare_image(image)[0])
+        if len(images) >= args.limit:
+            break
+
+    baseline = load_backend(args.weights, "pytorch", args.threads)
+    candidate = load_backend(args.weights, args.backend, args.threads)
+    # Warm both up so one-off initialisation isn't counted
+    compare_backends(baseline, candidate, images[:1], args.conf)
+    report = compare_backends(baseline, candidate, images, args.conf)
+    print(f"📊 {args.backend} vs pytorch on {report['images']} images: "
+          f"{report['candidate_ms']:.1f} ms vs {report['baseline_ms']:.1f} ms "
+          f"({report['speedup']:.2f}x), agreement {report['agreement']:.1%} "
+          f"(min {report['min_agreement']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
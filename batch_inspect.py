@@ -0,0 +1,55 @@
+"""Overnight batch inspection of a folder (or glob) of images.
+
+Usage:
+    python batch_inspect.py /data/shift_42 --output shift_42.jsonl
+    python batch_inspect.py "/data/**/*.jpg" --conf 0.5 --no-enhance
+"""
+import argparse
+import json
+import sys
+import time
+
+from inspector import DEFAULT_WEIGHTS, inspect_stream, iter_image_paths, load_yolo
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AlfaStack AI batch inspection")
+    parser.add_argument("target", help="Directory or glob pattern of images")
+    parser.add_argument("--output", "-o", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--conf", type=float, default=0.6, help="AI confidence threshold")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help="YOLO weights file")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per YOLO call")
+    parser.add_argument("--no-enhance", action="store_true", help="Skip sharpness/contrast enhancement")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = load_yolo(args.weights)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    processed = rejected = failed = 0
+    start = time.perf_counter()
+    try:
+        paths = iter_image_paths(args.target)
+        for record in inspect_stream(model, paths, args.conf, not args.no_enhance, args.batch_size):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if 'error' in record:
+                failed += 1
+                continue
+            processed += 1
+            if record['defects'] > 0:
+                rejected += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Inspected {processed} images ({rejected} rejected, {failed} unreadable) "
+          f"in {elapsed:.1f}s - {rate:.2f} images/sec", file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
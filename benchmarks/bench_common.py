@@ -0,0 +1,28 @@
+"""Helpers shared by the benchmarks that measure each case in a fresh interpreter.
+
+A benchmark re-runs its own script with a hidden ``--child`` argument; the
+child prints one JSON object as its last line of output, so ru_maxrss and
+import costs belong to that case alone.
+"""
+import json
+import resource
+import subprocess
+import sys
+
+
+class ChildFailed(RuntimeError):
+    """A benchmark child process exited with an error; the message is its last stderr line"""
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(script, *args):
+    """Run script with args in a fresh interpreter -> the JSON object on its last line of stdout"""
+    proc = subprocess.run([sys.executable, script, *args], capture_output=True, text=True)
+    if proc.returncode:
+        lines = proc.stderr.strip().splitlines()
+        raise ChildFailed(lines[-1] if lines else f"exit status {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
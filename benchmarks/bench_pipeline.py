@@ -0,0 +1,325 @@
+"""Offline benchmark suite for the inspection pipeline, with a JSON baseline and regression check.
+
+Every stage runs on synthetic data (no uploads, no network) across image
+resolutions and detection densities:
+
+    decode       probe + reduced-size JPEG decode, as for a single upload
+    enhance      fused downscale + sharpen/contrast to the inference size
+    inference    one model call per weights file, backend and batch size
+    postprocess  Detections, inspection dict, report and JSON record
+    render       display-resolution annotation
+    export       PNG encode of the rendered result
+    history      dashboard refresh (insert, summary, trend, page) on a prefilled SQLite store
+
+Each case runs in a fresh subprocess after one warm-up call, so its peak RSS
+is its own. The median latency, throughput, peak RSS and the memory the timed
+calls add on top of the warm-up (growth that builds up call after call) are
+recorded. ``--save`` writes them as the baseline. Later runs compare against
+it and exit with status 1 when a case is slower, peaks higher or grows more
+than the baseline by more than the threshold. Baselines are only comparable on the
+same machine.
+
+Usage:
+    python benchmarks/bench_pipeline.py --save                 # record benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py                        # compare, exit 1 on regression
+    python benchmarks/bench_pipeline.py --quick --stages decode enhance render
+    python benchmarks/bench_pipeline.py --models yolov8n.pt yolov8s.pt --backends pytorch onnx --batch-sizes 1 4
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+from bench_common import ChildFailed, peak_rss_mb, run_child as run_script
+from bench_render import NAMES, synthetic_detections, synthetic_frame
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+STAGES = ['decode', 'enhance', 'inference', 'postprocess', 'render', 'export', 'history']
+SIZES = ["640x480", "1920x1080", "4000x3000"]
+DENSITIES = [0, 10, 100]
+HISTORY_ROWS = [10000, 100000]
+
+
+def parse_size(size):
+    width, height = (int(v) for v in size.lower().split("x"))
+    return width, height
+
+
+# ---- Stage setups: each returns (callable, items per call) ----
+
+def setup_decode(workdir, size):
+    from exports import encode_image
+    from image_io import decode_for_inference, probe_image
+    data = encode_image(synthetic_frame(*parse_size(size)), "JPEG", 92)
+
+    def run():
+        return decode_for_inference(data, probe_image(data))
+    return run, 1
+
+
+def setup_enhance(workdir, size):
+    from PIL import Image
+    from preprocess import INFERENCE_SIZE, preprocess
+    image = Image.fromarray(synthetic_frame(*parse_size(size)))
+    return lambda: preprocess(image, True, INFERENCE_SIZE), 1
+
+
+def setup_inference(workdir, weights, backend, batch_size):
+    from backends import load_backend
+    from inspector import FLOOR_CONFIDENCE
+    batch_size = int(batch_size)
+    model = load_backend(weights, backend)
+    frames = [synthetic_frame(640, 480, seed=i) for i in range(batch_size)]
+    source = frames if batch_size > 1 else frames[0]
+    return lambda: model(source, conf=FLOOR_CONFIDENCE, verbose=False), batch_size
+
+
+def setup_postprocess(workdir, density):
+    from inspector import build_inspection, json_record
+    frame = synthetic_frame(640, 480)
+    result = synthetic_detections(640, 480, int(density)).to_result(frame, NAMES)
+    # A 12 MP original inferred at 640 px
+    scale = 640 / 4000
+
+    def run():
+        return json_record(build_inspection((4000, 3000), "bench.jpg", result, NAMES, scale=scale), NAMES)
+    return run, 1
+
+
+def setup_render(workdir, size, density):
+    from annotate import render_detections
+    width, height = parse_size(size)
+    frame = synthetic_frame(width, height)
+    detections = synthetic_detections(width, height, int(density))
+    return lambda: render_detections(frame, detections, NAMES), 1
+
+
+def setup_export(workdir, size):
+    from annotate import render_detections
+    from exports import encode_image
+    width, height = parse_size(size)
+    rendered = render_detections(synthetic_frame(width, height), synthetic_detections(width, height, 10), NAMES)
+    return lambda: encode_image(rendered, "PNG"), 1
+
+
+def setup_history(workdir, rows):
+    from history_store import HistoryStore
+    from inspector import get_verdict
+    rows = int(rows)
+    store = HistoryStore(os.path.join(workdir, "history.db"))
+    rng = np.random.default_rng(0)
+    now = datetime.now()
+    # Spread over 30 days so the 7-day window below is a real range query
+    offsets = np.sort(rng.uniform(0, 30 * 86400, rows))[::-1]
+    defects = rng.poisson(0.5, rows)
+    for start in range(0, rows, 10000):
+        store.add_many([{
+            'timestamp': now - timedelta(seconds=float(offsets[i])),
+            'defects': int(defects[i]),
+            'confidence': float(rng.uniform(0.3, 1.0)) if defects[i] else 0.0,
+            'status': get_verdict(defects[i]),
+            'image_name': f"part_{i:07d}.jpg",
+        } for i in range(start, min(rows, start + 10000))])
+    batch = [{'timestamp': now, 'defects': 1, 'confidence': 0.8, 'status': get_verdict(1),
+              'image_name': "bench.jpg"} for _ in range(32)]
+
+    def run():
+        since = datetime.now() - timedelta(days=7)
+        store.add_many(batch)
+        return store.summary(), store.trend(since), store.recent(50, since=since), store.count(since)
+    return run, 1
+
+
+SETUPS = {
+    'decode': setup_decode,
+    'enhance': setup_enhance,
+    'inference': setup_inference,
+    'postprocess': setup_postprocess,
+    'render': setup_render,
+    'export': setup_export,
+    'history': setup_history,
+}
+
+
+def run_child(stage, params, repeat):
+    with tempfile.TemporaryDirectory(prefix="alfastack_bench_") as workdir:
+        start = time.perf_counter()
+        fn, items = SETUPS[stage](workdir, *params)
+        setup = time.perf_counter() - start
+        fn()  # warm-up: lazy imports, allocator, model graph
+        before = peak_rss_mb()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        print(json.dumps({
+            'median_ms': median * 1000,
+            'min_ms': min(times) * 1000,
+            'throughput': items / median if median else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_extra_mb': peak_rss_mb() - before,
+            'setup_ms': setup * 1000,
+        }))
+
+
+# ---- Suite ----
+
+def build_cases(args):
+    cases = []
+    for size in args.sizes:
+        cases += [('decode', size), ('enhance', size)]
+    for weights in args.models:
+        for backend in args.backends:
+            cases += [('inference', weights, backend, str(batch)) for batch in args.batch_sizes]
+    cases += [('postprocess', str(density)) for density in args.densities]
+    for size in args.sizes:
+        cases += [('render', size, str(density)) for density in args.densities]
+    cases += [('export', size) for size in args.sizes]
+    cases += [('history', str(rows)) for rows in args.history_rows]
+    return [case for case in cases if case[0] in args.stages]
+
+
+def run_case(case, repeat):
+    try:
+        return run_script(__file__, "--repeat", str(repeat), "--child", *case)
+    except ChildFailed as e:
+        return {'error': str(e)}
+
+
+def machine_info():
+    import cv2
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+    try:
+        import torch
+        info['torch'] = torch.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(cases, baseline, threshold, memory_threshold, min_delta_ms, min_delta_mb):
+    """Per-case status against the baseline: 'ok', 'new', 'error', 'slower' or 'memory'"""
+    statuses = {}
+    for name, row in cases.items():
+        base = baseline.get('cases', {}).get(name) if baseline else None
+        if 'error' in row:
+            statuses[name] = 'error'
+        elif base is None or 'error' in base:
+            statuses[name] = 'new'
+        elif (row['median_ms'] > base['median_ms'] * (1 + threshold)
+              and row['median_ms'] - base['median_ms'] > min_delta_ms):
+            statuses[name] = 'slower'
+        elif any(row[key] > base.get(key, row[key]) * (1 + memory_threshold)
+                 and row[key] - base.get(key, row[key]) > min_delta_mb
+                 for key in ('peak_rss_mb', 'peak_extra_mb')):
+            statuses[name] = 'memory'
+        else:
+            statuses[name] = 'ok'
+    return statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--densities", type=int, nargs="+", default=DENSITIES, help="Detections per image")
+    parser.add_argument("--models", nargs="+", default=["yolov8n.pt"], help="Weights files")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], help="pytorch, onnx, onnx-int8, openvino")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1])
+    parser.add_argument("--history-rows", type=int, nargs="+", default=HISTORY_ROWS)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--quick", action="store_true", help="Two sizes, three repeats")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with or --save to")
+    parser.add_argument("--save", action="store_true", help="Write this run as the baseline instead of comparing")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed latency increase (0.25 = +25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="Allowed increase in peak RSS and in growth over the warm-up")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--min-delta-mb", type=float, default=16.0, help="Ignore memory growth smaller than this")
+    parser.add_argument("--child", nargs="+", metavar="CASE", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child[0], args.child[1:], args.repeat)
+        return 0
+    if args.quick:
+        args.sizes = args.sizes[:2]
+        args.history_rows = args.history_rows[:1]
+        args.repeat = min(args.repeat, 3)
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    cases = {}
+    print(f"{'case':<36} {'median ms':>10} {'per s':>9} {'peak MB':>8} {'+MB':>6} {'baseline':>9} {'change':>8}  status")
+    for case in build_cases(args):
+        name = "/".join(case)
+        row = cases[name] = run_case(case, args.repeat)
+        base = (baseline or {}).get('cases', {}).get(name, {})
+        status = compare({name: row}, baseline, args.threshold, args.memory_threshold, args.min_delta_ms,
+                         args.min_delta_mb)[name]
+        if 'error' in row:
+            print(f"{name:<36} {'-':>10} {'-':>9} {'-':>8} {'-':>6} {'-':>9} {'-':>8}  error: {row['error']}")
+            continue
+        change = f"{row['median_ms'] / base['median_ms'] - 1:+.0%}" if base.get('median_ms') else "-"
+        base_ms = f"{base['median_ms']:.1f}" if base.get('median_ms') else "-"
+        print(f"{name:<36} {row['median_ms']:>10.1f} {row['throughput']:>9.1f} {row['peak_rss_mb']:>8.0f} "
+              f"{row['peak_extra_mb']:>6.0f} {base_ms:>9} {change:>8}  {status}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'machine': machine_info(),
+        'repeat': args.repeat,
+        'cases': cases,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Baseline with {len(cases)} cases written to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; record one with --save")
+        return 0
+
+    if baseline.get('machine') != report['machine']:
+        print("\n⚠️ Baseline was recorded on a different machine or library versions; timings may not be comparable")
+    statuses = compare(cases, baseline, args.threshold, args.memory_threshold, args.min_delta_ms, args.min_delta_mb)
+    # A case that errors now but ran in the baseline is a regression; a new failing case is only reported
+    failed = [name for name, status in statuses.items()
+              if status in ('slower', 'memory') or (status == 'error' and name in baseline.get('cases', {}))]
+    if failed:
+        print(f"\n❌ {len(failed)} regression(s) beyond +{args.threshold:.0%} latency / "
+              f"+{args.memory_threshold:.0%} memory: {', '.join(failed)}")
+        return 1
+    errors = sum(status == 'error' for status in statuses.values())
+    note = f" ({errors} new case(s) failed to run)" if errors else ""
+    print(f"\n✅ No regressions in {len(cases) - errors} cases{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
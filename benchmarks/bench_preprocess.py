@@ -0,0 +1,120 @@
+"""Latency and peak-memory comparison: PIL full-resolution enhance vs fused downscale-first.
+
+Each (method, resolution) runs in a fresh subprocess on a decoded synthetic JPEG,
+so ru_maxrss reflects that method alone (PIL allocations are invisible to
+tracemalloc).
+
+Usage:
+    python benchmarks/bench_preprocess.py --megapixels 12 20 --repeat 3
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from bench_common import peak_rss_mb, run_child as run_script
+from inspector import enhance_image
+from preprocess import INFERENCE_SIZE, preprocess
+
+
+def synthetic_image(megapixels, seed=0):
+    """Smooth gradients + texture noise at a 4:3 aspect ratio"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(seed)
+    xx = np.linspace(0, 127, width, dtype=np.float32).astype(np.uint8)
+    yy = np.linspace(0, 127, height, dtype=np.float32).astype(np.uint8)
+    base = xx[None, :] // 2 + yy[:, None] // 2
+    image = np.dstack([base, base[::-1], base[:, ::-1]])
+    image += rng.integers(0, 40, image.shape, dtype=np.uint8)
+    return Image.fromarray(image)
+
+
+def write_sample(megapixels, directory):
+    path = os.path.join(directory, f"sample_{megapixels:g}mp.jpg")
+    if not os.path.exists(path):
+        synthetic_image(megapixels).save(path, quality=92)
+    return path
+
+
+def pil_path(image):
+    """What app.py did: full-resolution PIL enhance, model resizes afterwards"""
+    return enhance_image(np.array(image))
+
+
+def fused_path(image):
+    return preprocess(image, True, INFERENCE_SIZE)[0]
+
+
+METHODS = {'pil': pil_path, 'fused': fused_path}
+
+
+def run_child(method, path, repeat):
+    image = Image.open(path)
+    image.load()
+    fn = METHODS[method]
+    before = peak_rss_mb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(image)
+        times.append(time.perf_counter() - start)
+    print(json.dumps({
+        'method': method,
+        'latency_ms': min(times) * 1000,
+        'peak_extra_mb': peak_rss_mb() - before,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def equivalence(path):
+    """Difference between fused and PIL enhancement at the same (inference) resolution"""
+    image = Image.open(path)
+    resized, _ = preprocess(image, False, INFERENCE_SIZE)
+    reference = enhance_image(resized).astype(np.int16)
+    fused = preprocess(Image.fromarray(resized), True, None)[0].astype(np.int16)
+    diff = np.abs(fused - reference)
+    return float(diff.mean()), int(diff.max())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[2, 12, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.repeat)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="alfastack_bench_")
+    try:
+        compare(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(args, workdir):
+    print(f"{'MP':>5} {'method':>6} {'latency ms':>11} {'peak +MB':>9} {'RSS MB':>8}")
+    for mp in args.megapixels:
+        path = write_sample(mp, workdir)
+        rows = {}
+        for method in METHODS:
+            row = rows[method] = run_script(__file__, "--child", method, path, "--repeat", str(args.repeat))
+            print(f"{mp:>5g} {method:>6} {row['latency_ms']:>11.1f} {row['peak_extra_mb']:>9.1f} {row['peak_rss_mb']:>8.1f}")
+        mean_diff, max_diff = equivalence(path)
+        speedup = rows['pil']['latency_ms'] / rows['fused']['latency_ms']
+        print(f"      -> {speedup:.1f}x faster, output diff vs PIL: mean {mean_diff:.2f}, max {max_diff} levels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Result rendering: Results.plot() + colour conversion + encode vs display-resolution render_detections.
+
+The old path annotated a full-resolution BGR copy of the frame, converted it
+back to RGB, wrapped it in PIL images for display and thumbnail and encoded
+it for download on every rerun. The new one draws once at display resolution
+and encodes only when a download is requested. No model is needed: synthetic
+frames get random detections.
+
+Usage:
+    python benchmarks/bench_render.py --sizes 640x480 4000x3000 --boxes 20 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from annotate import render_detections
+from detections import Detections
+from exports import encode_image
+
+NAMES = {i: f"class_{i}" for i in range(80)}
+
+
+def synthetic_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.zeros((height, width, 3), np.uint8)
+    frame[:] = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None]
+    frame += rng.integers(0, 30, frame.shape, dtype=np.uint8)
+    return frame
+
+
+def synthetic_detections(width, height, count, seed=0):
+    rng = np.random.default_rng(seed)
+    x0 = rng.uniform(0, width * 0.8, count)
+    y0 = rng.uniform(0, height * 0.8, count)
+    w = rng.uniform(0.05, 0.2, count) * width
+    h = rng.uniform(0.05, 0.2, count) * height
+    xyxy = np.stack([x0, y0, np.minimum(x0 + w, width), np.minimum(y0 + h, height)], axis=1)
+    return Detections(xyxy.astype(np.float32), rng.uniform(0.3, 1.0, count).astype(np.float32),
+                      rng.integers(0, len(NAMES), count))
+
+
+def plot_path(frame, detections, fmt):
+    """What app.py did on every rerun"""
+    plotted = detections.to_result(frame, NAMES).plot()
+    rgb = cv2.cvtColor(plotted, cv2.COLOR_BGR2RGB)
+    display = Image.fromarray(rgb)
+    thumb = Image.fromarray(rgb)
+    thumb.thumbnail((320, 320))
+    return display, thumb, encode_image(rgb, fmt)
+
+
+def render_path(frame, detections, fmt):
+    """Display array and thumbnail; encoding is deferred and cached, so it is timed separately"""
+    return render_detections(frame, detections, NAMES), render_detections(frame, detections, NAMES, 320)
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times) * 1000, peak / 1024 / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1920x1080", "4000x3000"])
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--format", default="PNG", choices=["PNG", "JPEG", "WebP"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>10} {'method':>7} {'rerun ms':>9} {'peak MB':>8} {'download ms':>12} {'output':>10}")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.lower().split("x"))
+        frame = synthetic_frame(width, height)
+        detections = synthetic_detections(width, height, args.boxes)
+        plot_ms, plot_mb = measure(lambda: plot_path(frame, detections, args.format), args.repeat)
+        render_ms, render_mb = measure(lambda: render_path(frame, detections, args.format), args.repeat)
+        display = render_detections(frame, detections, NAMES)
+        encode_ms, _ = measure(lambda: encode_image(display, args.format), args.repeat)
+        print(f"{size:>10} {'plot':>7} {plot_ms:>9.1f} {plot_mb:>8.1f} {'(per rerun)':>12} {f'{width}x{height}':>10}")
+        print(f"{size:>10} {'render':>7} {render_ms:>9.1f} {render_mb:>8.1f} {encode_ms:>12.1f} "
+              f"{f'{display.shape[1]}x{display.shape[0]}':>10}")
+        print(f"           -> {plot_ms / render_ms:.1f}x faster per rerun")
+
+
+if __name__ == "__main__":
+    main()
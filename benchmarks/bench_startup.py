@@ -0,0 +1,105 @@
+"""Cold-start breakdown: import time vs model load vs first inference.
+
+Each run is a fresh interpreter that imports the app's dependencies in stages,
+loads the weights and runs two inferences, timing every step. The page shell
+only waits for streamlit; the app modules (numpy, cv2) and pandas/plotly load
+after it is drawn, and loading and warm-up happen on a background thread.
+
+Usage:
+    python benchmarks/bench_startup.py --weights yolov8n.pt --runs 3
+    python benchmarks/bench_startup.py --app    # also time a full first script run via AppTest
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_common import run_child as run_script
+
+STAGES = ['streamlit', 'app modules', 'pandas + plotly', 'ultralytics', 'model load',
+          'first inference', 'second inference']
+
+
+def run_child(weights, backend):
+    timings = {}
+
+    def timed(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    def import_app_modules():
+        import backends, detections, exports, history_store, image_io, inspector, instrumentation  # noqa: F401
+        import model_registry, result_cache, session_memory, tiling, worker_pool  # noqa: F401
+
+    def import_frames():
+        import pandas  # noqa: F401
+        import plotly.express  # noqa: F401
+
+    import numpy as np
+
+    timed('streamlit', lambda: __import__('streamlit'))
+    timed('app modules', import_app_modules)
+    timed('pandas + plotly', import_frames)
+    timed('ultralytics', lambda: __import__('ultralytics'))
+    from backends import load_backend
+    model = timed('model load', lambda: load_backend(weights, backend))
+    frame = np.zeros((640, 640, 3), dtype=np.uint8)
+    timed('first inference', lambda: model(frame, verbose=False))
+    timed('second inference', lambda: model(frame, verbose=False))
+    print(json.dumps(timings))
+
+
+def run_app_child():
+    """Wall time of the first full script run, which no longer waits for the model"""
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    at.run()
+    print(json.dumps({'first script run': time.perf_counter() - start}))
+
+
+def child(args, *extra):
+    return run_script(__file__, *extra, "--weights", args.weights, "--backend", args.backend)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weights", default="yolov8n.pt")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--app", action="store_true", help="also time the first app script run (AppTest)")
+    parser.add_argument("--child", choices=["stages", "app"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "stages":
+        run_child(args.weights, args.backend)
+        return
+    if args.child == "app":
+        run_app_child()
+        return
+
+    runs = [child(args, "--child", "stages") for _ in range(args.runs)]
+    median = {stage: statistics.median(run[stage] for run in runs) for stage in STAGES}
+    print(f"{'stage':>18} {'median ms':>10}")
+    for stage in STAGES:
+        print(f"{stage:>18} {median[stage] * 1000:>10.0f}")
+    shell = median['streamlit']
+    imports = sum(median[s] for s in STAGES[:3])
+    blocking = sum(median[s] for s in STAGES[:6])
+    print(f"\nimports before first paint: {shell * 1000:.0f} ms "
+          f"(previously imports + model load + warm-up: {blocking * 1000:.0f} ms)")
+    print(f"page controls ready after: {imports * 1000:.0f} ms")
+    print(f"model ready in background after: {(blocking - imports) * 1000:.0f} ms")
+    if args.app:
+        print(f"first full script run: {child(args, '--child', 'app')['first script run'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,21 @@
-import requests
 import time
-import threading
 from flask import Flask, jsonify
+from inspect_api import inspect_api, service_status, start_background_load
+from prober import prober_from_env
 
 app = Flask(__name__)
+app.register_blueprint(inspect_api)
+prober = prober_from_env()
 
 @app.route('/health')
 def health_check():
-    return jsonify({
+    # Liveness stays 200; "ready" and the model block say whether inference can serve
+    return jsonify(dict({
         "status": "healthy", 
         "service": "AlfaStack AI",
         "timestamp": time.time(),
         "message": "Server is running"
-    }), 200
+    }, **service_status())), 200
 
 @app.route('/')
 def home():
@@ -20,28 +23,29 @@ def home():
         "message": "AlfaStack AI Health Monitor",
         "endpoints": {
             "health": "/health",
+            "inspect": "/inspect (POST multipart 'image' fields)",
+            "ready": "/ready",
+            "metrics": "/metrics",
+            "probes": "/probes",
             "docs": "https://github.com/your-repo"
         }
     }), 200
 
-def ping_render_app():
-    """Ping the main Streamlit app every 14 minutes"""
-    while True:
-        try:
-            response = requests.get("https://alfastack-ai-inspector.onrender.com", timeout=10)
-            print(f"✅ Ping successful - Status: {response.status_code} - {time.ctime()}")
-        except Exception as e:
-            print(f"❌ Ping failed: {e}")
-        time.sleep(840)  # 14 minutes
+@app.route('/probes')
+def probes():
+    """Keep-alive probe results: latency percentiles, cold starts, recent history"""
+    return jsonify(prober.summary()), 200
 
 if __name__ == "__main__":
     print("🚀 Starting AlfaStack Health Monitor...")
     
-    # Start ping service in background
-    ping_thread = threading.Thread(target=ping_render_app, daemon=True)
-    ping_thread.start()
+    # Start the async prober in background
+    prober.start_in_thread()
+    
+    print(f"✅ Health monitor started. Probing {len(prober.targets)} target(s) every {prober.interval / 60:.0f} minutes...")
     
-    print("✅ Health monitor started. Pinging every 14 minutes...")
+    # Load and warm the inspection model in the background; /ready reports when it can serve
+    start_background_load()
     
     # Start Flask server
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,207 @@
+"""Perceptual-hash index of recently inspected images.
+
+Resubmitted parts and idle conveyor frames are near-identical to something
+already inspected. Each image is reduced to a 64-bit perceptual hash (pHash:
+sign of the low-frequency DCT of a 32x32 grey thumbnail; dHash: horizontal
+gradient signs of a 9x8 thumbnail) and looked up in a BK-tree by Hamming
+distance. A match within ``max_distance`` bits hands back the stored
+detections, so the model is not run again.
+
+The index keeps at most ``max_entries`` images, evicting the least recently
+matched. A BK-tree cannot delete in place, so evicted entries are left as
+tombstones and the tree is rebuilt from the live entries once they outnumber them.
+Matches only count within the same context (model, backend, settings).
+
+A tiny defect moves the hash by only a bit or two, so by default a scope only
+reuses exact resubmissions: hash distance 0 *and* the same content digest
+(upload bytes, or decoded pixels for video frames). Fuzzy matching within
+``max_distance`` has to be asked for explicitly.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from image_io import content_digest
+from preprocess import as_rgb_array
+
+DEFAULT_MAX_DISTANCE = 0
+FUZZY_MAX_DISTANCE = 1
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def _grey(image, size):
+    return cv2.resize(cv2.cvtColor(as_rgb_array(image), cv2.COLOR_RGB2GRAY), size, interpolation=cv2.INTER_AREA)
+
+
+def _pack(bits):
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), 'big')
+
+
+def phash(image):
+    """64-bit DCT hash; robust to rescaling, recompression and small brightness shifts"""
+    low = cv2.dct(_grey(image, (32, 32)).astype(np.float32))[:8, :8]
+    # The DC term is the mean brightness; leave it out of the median
+    return _pack(low > np.median(low.reshape(-1)[1:]))
+
+
+def dhash(image):
+    """64-bit gradient hash; cheaper than pHash, slightly less robust"""
+    grey = _grey(image, (9, 8)).astype(np.int16)
+    return _pack(grey[:, 1:] > grey[:, :-1])
+
+
+HASHES = {'phash': phash, 'dhash': dhash}
+
+
+def pixel_digest(image):
+    """Content digest of decoded pixels, for frames that have no upload bytes"""
+    return content_digest(np.ascontiguousarray(as_rgb_array(image)).tobytes())
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Metric tree over integer hashes; finds every item within a Hamming radius"""
+
+    def __init__(self):
+        self.root = None  # [hash, ids, {distance: child}]
+        self.size = 0
+
+    def add(self, image_hash, item_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [image_hash, [item_id], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(image_hash, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [image_hash, [item_id], {}]
+                return
+            node = child
+
+    def search(self, image_hash, radius):
+        """(distance, id) pairs within radius"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(image_hash, node[0])
+            if distance <= radius:
+                found.extend((distance, item_id) for item_id in node[1])
+            # Triangle inequality: only children at distance d +- radius can hold matches
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class DuplicateIndex:
+    """Bounded, thread-safe near-duplicate lookup with hit-rate counters"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_distance=DEFAULT_MAX_DISTANCE, method='phash'):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.method = method
+        self.hash = HASHES[method]
+        self._entries = OrderedDict()  # id -> (hash, context, value, digest), least recently used first
+        self._tree = BKTree()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def find(self, image_hash, context, max_distance=None, digest=None):
+        """Closest stored value for context within max_distance bits, as (value, distance), or None.
+
+        With a digest, only entries added with the same digest match.
+        """
+        radius = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            best = None
+            for distance, item_id in self._tree.search(image_hash, radius):
+                entry = self._entries.get(item_id)
+                if entry is None or entry[1] != context or (digest is not None and entry[3] != digest):
+                    continue
+                # Nearest wins; among equals the newest (ids only increase)
+                if best is None or (distance, -item_id) < (best[0], -best[1]):
+                    best = (distance, item_id)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            return self._entries[best[1]][2], best[0]
+
+    def add(self, image_hash, context, value, digest=None):
+        with self._lock:
+            item_id = next(self._ids)
+            self._entries[item_id] = (image_hash, context, value, digest)
+            self._tree.add(image_hash, item_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if self._tree.size > 2 * len(self._entries) + 64:
+                self._rebuild()
+
+    def _rebuild(self):
+        self._tree = BKTree()
+        for item_id, (image_hash, *_) in self._entries.items():
+            self._tree.add(image_hash, item_id)
+
+    def scope(self, context, max_distance=None, fuzzy=False):
+        return DuplicateScope(self, context, max_distance, fuzzy)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tree = BKTree()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class DuplicateScope:
+    """The index bound to one context, as passed to inspect_batch.
+
+    Exact unless fuzzy: then only hash distance 0 with the same digest matches.
+    """
+
+    def __init__(self, index, context, max_distance=None, fuzzy=False):
+        self.index = index
+        self.context = context
+        self.fuzzy = fuzzy
+        self.max_distance = max_distance if fuzzy else 0
+
+    def hash(self, image):
+        return self.index.hash(image)
+
+    def digest(self, image):
+        return pixel_digest(image)
+
+    def find(self, image_hash, digest=None):
+        if not self.fuzzy and digest is None:
+            return None
+        return self.index.find(image_hash, self.context, self.max_distance, None if self.fuzzy else digest)
+
+    def add(self, image_hash, value, digest=None):
+        self.index.add(image_hash, self.context, value, digest)
@@ -0,0 +1,126 @@
+"""Columnar detection table built once from YOLO result tensors."""
+import numpy as np
+
+
+class Detections:
+    """Boxes, scores and classes as contiguous NumPy arrays with vectorized geometry"""
+
+    __slots__ = ('xyxy', 'conf', 'cls')
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        return cls(np.concatenate([p.xyxy for p in parts]),
+                   np.concatenate([p.conf for p in parts]),
+                   np.concatenate([p.cls for p in parts]))
+
+    @classmethod
+    def from_result(cls, result):
+        """One device->host copy per field instead of per-box .item()/.tolist()"""
+        if result is None or result.boxes is None or len(result.boxes) == 0:
+            return cls.empty()
+        data = result.boxes.data.cpu().numpy()
+        return cls(data[:, :4], data[:, -2], data[:, -1])
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index])
+
+    def offset(self, dx, dy):
+        """Shift boxes, e.g. from tile to full-image coordinates"""
+        return Detections(self.xyxy + np.array([dx, dy, dx, dy], dtype=np.float32), self.conf, self.cls)
+
+    def rescale(self, factor):
+        """Scale box coordinates, e.g. from inference resolution back to original pixels"""
+        if factor == 1:
+            return self
+        return Detections(self.xyxy * np.float32(factor), self.conf, self.cls)
+
+    def to_result(self, orig_img, names):
+        """Wrap as an ultralytics Results so .plot() and slicing keep working"""
+        import torch
+        from ultralytics.engine.results import Results
+
+        data = np.concatenate([self.xyxy, self.conf[:, None], self.cls[:, None].astype(np.float32)], axis=1)
+        return Results(orig_img, path="image0.jpg", names=names, boxes=torch.from_numpy(data))
+
+    def mask(self, confidence):
+        return self.conf >= confidence
+
+    def filter(self, confidence):
+        """Re-threshold without touching the model"""
+        return self[self.mask(confidence)]
+
+    @property
+    def nbytes(self):
+        return self.xyxy.nbytes + self.conf.nbytes + self.cls.nbytes
+
+    # ---- Vectorized measurements ----
+
+    @property
+    def widths(self):
+        return self.xyxy[:, 2] - self.xyxy[:, 0]
+
+    @property
+    def heights(self):
+        return self.xyxy[:, 3] - self.xyxy[:, 1]
+
+    @property
+    def areas(self):
+        return self.widths * self.heights
+
+    @property
+    def aspect_ratios(self):
+        heights = self.heights
+        return np.divide(self.widths, heights, out=np.zeros_like(heights), where=heights > 0)
+
+    @property
+    def mean_confidence(self):
+        return float(self.conf.mean()) if len(self) else 0
+
+    @property
+    def total_area(self):
+        return float(self.areas.sum())
+
+    def class_names(self, names):
+        return [names[int(c)].upper() for c in self.cls]
+
+    # ---- Views ----
+
+    def table(self, names):
+        """Column dict for the Detailed Analysis Report DataFrame"""
+        return {
+            'Defect ID': np.arange(1, len(self) + 1),
+            'Type': self.class_names(names),
+            'Confidence': np.char.mod('%.1f%%', self.conf * 100),
+            'Width': np.char.mod('%.1fpx', self.widths),
+            'Height': np.char.mod('%.1fpx', self.heights),
+            'Area': np.char.mod('%.1fpx²', self.areas),
+            'Aspect Ratio': np.char.mod('%.2f', self.aspect_ratios)
+        }
+
+    def records(self, names):
+        """Plain numeric rows for JSON output"""
+        columns = zip(self.class_names(names), self.conf.tolist(), self.xyxy.tolist(),
+                      self.widths.tolist(), self.heights.tolist(), self.areas.tolist())
+        return [{
+            'type': class_name,
+            'confidence': conf,
+            'xyxy': xyxy,
+            'width': width,
+            'height': height,
+            'area': area
+        } for class_name, conf, xyxy, width, height, area in columns]
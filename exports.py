@@ -0,0 +1,91 @@
+"""On-demand export artifacts.
+
+Exports are built only when a download is requested (``st.download_button``
+accepts a callable), instead of base64-encoding every payload into the page on
+each rerun. History rows are read from the store and serialised one chunk at
+a time into a temporary file, so building the export never holds more than
+one chunk of rows. The finished file is still returned as bytes:
+``st.download_button`` reads the whole payload into memory before serving
+it, so the download itself costs the size of the export.
+"""
+import io
+import tempfile
+from itertools import islice
+
+from PIL import Image
+
+HISTORY_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+IMAGE_FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WebP": ("webp", "image/webp"),
+    "PNG": ("png", "image/png"),
+}
+
+EXPORT_CHUNK_ROWS = 10000
+
+
+def iter_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """DataFrames of at most chunk_rows rows"""
+    import pandas as pd
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk)
+
+
+def write_history(rows, out, fmt="CSV", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write history records to a binary file object one chunk at a time"""
+    if fmt == "Parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+        writer = None
+        for chunk in iter_chunks(rows, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema, compression="zstd")
+            writer.write_table(table)  # one row group per chunk
+        if writer is not None:
+            writer.close()
+        return
+
+    if fmt not in ("CSV", "JSONL"):
+        raise ValueError(f"Unknown export format: {fmt}")
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    for i, chunk in enumerate(iter_chunks(rows, chunk_rows)):
+        if fmt == "CSV":
+            chunk.to_csv(text, header=i == 0, index=False)
+        else:
+            lines = chunk.to_json(orient="records", lines=True, date_format="iso")
+            text.write(lines if lines.endswith("\n") else lines + "\n")
+    text.detach()
+
+
+def export_history(store, fmt="CSV", chunk_rows=EXPORT_CHUNK_ROWS):
+    """The full history export as bytes (the temporary file is closed before returning)"""
+    with tempfile.TemporaryFile() as out:
+        write_history(store.iter_rows(chunk_rows), out, fmt, chunk_rows)
+        out.seek(0)
+        return out.read()
+
+
+def encode_image(image, fmt="JPEG", quality=90):
+    """Encode a PIL image or RGB array; quality applies to JPEG/WebP"""
+    if not hasattr(image, 'save'):
+        image = Image.fromarray(image)
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", optimize=False, compress_level=6)
+    else:
+        image.save(buffer, format=fmt, quality=int(quality))
+    return buffer.getvalue()
@@ -0,0 +1,283 @@
+"""Golden-reference change gating for fixed-fixture inspection.
+
+When every part is photographed in the same fixture, most of each frame is
+identical to a known-good reference. Each image is compared with the
+registered reference for its product before the model runs:
+
+* both are reduced to blurred, mean-normalised greyscale at ``WORK_SIZE``;
+* the image is aligned to the reference by phase correlation (fixture jitter
+  is a small translation);
+* pixels differing by more than ``pixel_tolerance`` grey levels form the
+  change mask (the blur absorbs sensor noise and sub-pixel misalignment, so
+  a scratch a few pixels wide still registers).
+
+An image whose changed area is below ``area_tolerance`` passes immediately,
+with no inference at all. Otherwise the changed regions are padded, merged
+and cropped, and only those crops go through the model (batched across
+images); detections are shifted back to full-frame coordinates. Widespread
+change, too many regions or a misregistered frame fall back to the full frame.
+
+References live as PNGs under ALFASTACK_REFERENCE_DIR (default "references").
+"""
+import os
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from backends import nms
+from detections import Detections
+from preprocess import as_rgb_array
+
+REFERENCE_DIR = os.environ.get("ALFASTACK_REFERENCE_DIR", "references")
+WORK_SIZE = 320
+DEFAULT_GATE = {
+    'pixel_tolerance': 30,  # grey levels
+    'area_tolerance': 0.0002,  # fraction of the frame that may change and still PASS (~15 work pixels)
+    'margin': 8,  # work pixels of context around each changed region
+    'min_roi': 48,  # smallest crop side, in work pixels
+    'max_rois': 8,
+    'full_frame_above': 0.35,  # changed fraction beyond which the whole frame is inspected
+    'max_shift': 0.1,  # alignment beyond this fraction of the frame counts as misregistered
+    'min_response': 0.3,  # weaker phase-correlation peaks mean the frame does not match the reference
+    'merge_iou': 0.5,
+}
+
+
+def product_slug(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name.strip()).strip("._") or "product"
+
+
+def _work_grey(image):
+    """Blurred float32 greyscale at WORK_SIZE with the mean brightness removed"""
+    rgb = as_rgb_array(image)
+    height, width = rgb.shape[:2]
+    scale = WORK_SIZE / max(height, width)
+    grey = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    grey = cv2.resize(grey, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+    grey = cv2.GaussianBlur(grey, (5, 5), 0).astype(np.float32)
+    # Lighting drift between shots shifts every pixel alike; only local change should count
+    return grey - grey.mean()
+
+
+def _fraction(value, length):
+    return float(min(max(value / length, 0.0), 1.0))
+
+
+def _boxes(mask, margin, min_roi):
+    """Padded bounding boxes (x0, y0, x1, y1) of the changed regions, in work pixels"""
+    height, width = mask.shape
+    if margin:
+        mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (2 * margin + 1, 2 * margin + 1)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = []
+    for x, y, w, h, _ in stats[1:count]:
+        # Grow small regions to min_roi around their centre so the model sees some context
+        grow_w, grow_h = max(0, min_roi - w), max(0, min_roi - h)
+        x0, y0 = max(0, x - grow_w // 2), max(0, y - grow_h // 2)
+        boxes.append((x0, y0, min(width, x0 + max(w, min_roi)), min(height, y0 + max(h, min_roi))))
+    return boxes
+
+
+class ReferenceGate:
+    """One product's reference image with the gate settings to compare against it"""
+
+    def __init__(self, product, image, version, library=None, **config):
+        self.product = product
+        self.version = version
+        self.library = library
+        self.config = dict(DEFAULT_GATE, **config)
+        self.reference = _work_grey(image)
+        self._window = cv2.createHanningWindow(self.reference.shape[::-1], cv2.CV_32F)
+
+    @property
+    def key(self):
+        """Identifies reference and tolerances (used in cache keys)"""
+        c = self.config
+        return f"ref:{self.product}@{self.version}:{c['pixel_tolerance']}:{c['area_tolerance']:g}"
+
+    def compare(self, image):
+        """Gate decision for a raw (unenhanced) image.
+
+        Returns a dict with 'verdict' ('unchanged', 'roi' or 'full'), the
+        changed fraction, the alignment shift in work pixels, 'rois' as
+        (x0, y0, x1, y1) fractions of the frame and the fraction of the frame
+        left for inference. The change mask is built in reference
+        coordinates; rois are shifted back into the image's own coordinates.
+        """
+        c = self.config
+        grey = _work_grey(image)
+        if grey.shape != self.reference.shape:
+            return {'verdict': 'full', 'changed': 1.0, 'shift': (0.0, 0.0), 'rois': [], 'inferred_fraction': 1.0,
+                    'reason': 'size'}
+        # Some OpenCV builds apply the window in place; keep the reference and the frame intact
+        (dx, dy), response = cv2.phaseCorrelate(self.reference.copy(), grey.copy(), self._window)
+        height, width = grey.shape
+        if response < c['min_response'] or abs(dx) > c['max_shift'] * width or abs(dy) > c['max_shift'] * height:
+            return {'verdict': 'full', 'changed': 1.0, 'shift': (dx, dy), 'rois': [], 'inferred_fraction': 1.0,
+                    'reason': 'alignment'}
+        aligned = cv2.warpAffine(grey, np.float32([[1, 0, -dx], [0, 1, -dy]]), (width, height),
+                                 borderMode=cv2.BORDER_REPLICATE)
+        mask = (cv2.absdiff(aligned, self.reference) > c['pixel_tolerance']).astype(np.uint8)
+        # Ignore the band that the shift pulled in from outside the frame: aligned (x, y) samples
+        # grey (x + dx, y + dy), so only the right/bottom edge is invalid for a positive shift
+        # and only the left/top edge for a negative one
+        bx, by = int(np.ceil(abs(dx))), int(np.ceil(abs(dy)))
+        if bx:
+            if dx > 0:
+                mask[:, width - bx:] = 0
+            else:
+                mask[:, :bx] = 0
+        if by:
+            if dy > 0:
+                mask[height - by:] = 0
+            else:
+                mask[:by] = 0
+        changed = float(mask.mean())
+        gate = {'verdict': 'unchanged', 'changed': changed, 'shift': (dx, dy), 'rois': [], 'inferred_fraction': 0.0}
+        if changed < c['area_tolerance']:
+            return gate
+        boxes = _boxes(mask, c['margin'], c['min_roi'])
+        if changed > c['full_frame_above'] or len(boxes) > c['max_rois']:
+            return dict(gate, verdict='full', inferred_fraction=1.0, reason='widespread')
+        gate['verdict'] = 'roi'
+        # Reference pixel (x, y) shows up at (x + dx, y + dy) in the image being inspected
+        gate['rois'] = [(_fraction(x0 + dx, width), _fraction(y0 + dy, height),
+                         _fraction(x1 + dx, width), _fraction(y1 + dy, height)) for x0, y0, x1, y1 in boxes]
+        gate['inferred_fraction'] = min(1.0, sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes) / mask.size)
+        return gate
+
+
+def roi_pixels(gate, width, height):
+    """A gate's rois as integer (x0, y0, x1, y1) boxes in a width x height frame"""
+    boxes = []
+    for fx0, fy0, fx1, fy1 in gate['rois']:
+        x0, y0 = int(fx0 * width), int(fy0 * height)
+        x1, y1 = int(np.ceil(fx1 * width)), int(np.ceil(fy1 * height))
+        if x1 > x0 and y1 > y0:
+            boxes.append((x0, y0, x1, y1))
+    return boxes
+
+
+def gated_detect(model, images, frames, reference, confidence, batch_size=8):
+    """Gate each raw image against the reference and run the model on what changed.
+
+    frames are the prepared model inputs for images (any resolution); crops are
+    cut from them. Returns (Detections in frame pixels per image, gate per
+    image, timings). Unchanged images get no detections and no model call.
+    """
+    timings = {}
+    start = time.perf_counter()
+    gates = [reference.compare(image) for image in images]
+    timings['gate'] = time.perf_counter() - start
+    if reference.library is not None:
+        reference.library.record(gates)
+
+    crops, origins = [], []
+    for i, (frame, gate) in enumerate(zip(frames, gates)):
+        height, width = frame.shape[:2]
+        if gate['verdict'] == 'full':
+            crops.append(frame)
+            origins.append((i, 0, 0))
+        for x0, y0, x1, y1 in roi_pixels(gate, width, height):
+            crops.append(frame[y0:y1, x0:x1])
+            origins.append((i, x0, y0))
+
+    start = time.perf_counter()
+    parts = [[] for _ in frames]
+    for offset in range(0, len(crops), batch_size):
+        results = model(crops[offset:offset + batch_size], conf=confidence, verbose=False)
+        for (i, x0, y0), result in zip(origins[offset:offset + batch_size], results):
+            parts[i].append(Detections.from_result(result).offset(x0, y0))
+    timings['inference'] = time.perf_counter() - start
+
+    detections = []
+    for i, frame_parts in enumerate(parts):
+        merged = Detections.concat(frame_parts)
+        if len(frame_parts) > 1 and len(merged):
+            # Neighbouring ROIs can overlap; keep one box per object
+            merged = merged[nms(merged.xyxy, merged.conf, merged.cls, reference.config['merge_iou'],
+                                max_det=len(merged), metric="ios")]
+        detections.append(merged)
+    timings['rois'] = len(crops)
+    return detections, gates, timings
+
+
+class ReferenceLibrary:
+    """Per-product reference images on disk, with gate counters shared by all sessions"""
+
+    def __init__(self, directory=REFERENCE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._gates = {}
+        self.reset_stats()
+
+    def _path(self, product):
+        return os.path.join(self.directory, f"{product_slug(product)}.png")
+
+    def products(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith(".png"))
+
+    def register(self, product, image):
+        """Store image as the known-good reference for product (replacing any previous one)"""
+        os.makedirs(self.directory, exist_ok=True)
+        product = product_slug(product)
+        cv2.imwrite(self._path(product), cv2.cvtColor(as_rgb_array(image), cv2.COLOR_RGB2BGR))
+        with self._lock:
+            self._gates = {key: gate for key, gate in self._gates.items() if key[0] != product}
+        return product
+
+    def remove(self, product):
+        product = product_slug(product)
+        path = self._path(product)
+        if os.path.exists(path):
+            os.remove(path)
+        with self._lock:
+            self._gates = {key: gate for key, gate in self._gates.items() if key[0] != product}
+
+    def gate(self, product, **config):
+        """ReferenceGate for product with the given tolerances, or None if not registered"""
+        product = product_slug(product)
+        path = self._path(product)
+        if not os.path.exists(path):
+            return None
+        version = int(os.path.getmtime(path) * 1000)
+        key = (product, version, tuple(sorted(config.items())))
+        with self._lock:
+            gate = self._gates.get(key)
+        if gate is None:
+            image = cv2.cvtColor(cv2.imread(path, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+            gate = ReferenceGate(product, image, version, self, **config)
+            with self._lock:
+                self._gates[key] = gate
+        return gate
+
+    def record(self, gates):
+        with self._lock:
+            for gate in gates:
+                self.frames += 1
+                self.verdicts[gate['verdict']] += 1
+                self.inferred += gate.get('inferred_fraction', 0.0)
+
+    def reset_stats(self):
+        with self._lock:
+            self.frames = 0
+            self.verdicts = {'unchanged': 0, 'roi': 0, 'full': 0}
+            self.inferred = 0.0
+
+    def stats(self):
+        with self._lock:
+            frames = self.frames
+            return {
+                'frames': frames,
+                'unchanged': self.verdicts['unchanged'],
+                'roi': self.verdicts['roi'],
+                'full': self.verdicts['full'],
+                'inferences_avoided': self.verdicts['unchanged'] / frames if frames else 0.0,
+                'pixels_avoided': float(1 - self.inferred / frames) if frames else 0.0,
+            }
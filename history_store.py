@@ -0,0 +1,172 @@
+"""Persistent inspection history in SQLite with running aggregates.
+
+Rows are indexed by timestamp, and the dashboard totals (count, passes, sums
+and per-status counts) are maintained by triggers on insert. Reading the
+summary is then O(1) however many inspections have been stored, across all
+sessions and restarts.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.environ.get("ALFASTACK_HISTORY_DB", "inspection_history.db")
+TREND_BUCKETS = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inspections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    defects INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    status TEXT NOT NULL,
+    image_name TEXT,
+    duplicate INTEGER NOT NULL DEFAULT 0
+);
+-- Covers the trend query: bucketing reads the index only, never the rows
+CREATE INDEX IF NOT EXISTS idx_inspections_ts_defects ON inspections (ts, defects);
+DROP INDEX IF EXISTS idx_inspections_ts;
+
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    inspections INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    defects INTEGER NOT NULL,
+    confidence REAL NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0, 0, 0.0);
+
+CREATE TABLE IF NOT EXISTS status_counts (
+    status TEXT PRIMARY KEY,
+    inspections INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS inspections_after_insert AFTER INSERT ON inspections
+BEGIN
+    UPDATE totals SET
+        inspections = inspections + 1,
+        passed = passed + (NEW.defects = 0),
+        defects = defects + NEW.defects,
+        confidence = confidence + NEW.confidence
+    WHERE id = 0;
+    INSERT INTO status_counts VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET inspections = inspections + 1;
+END;
+"""
+
+
+COLUMNS = "ts, defects, confidence, status, image_name, duplicate"
+
+
+def _row_to_record(row):
+    ts, defects, confidence, status, image_name, duplicate = row
+    return {
+        'timestamp': datetime.fromtimestamp(ts),
+        'defects': defects,
+        'confidence': confidence,
+        'status': status,
+        'image_name': image_name,
+        'duplicate': bool(duplicate)
+    }
+
+
+class HistoryStore:
+    """Thread-safe SQLite history; one connection per thread, WAL journaling"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Databases created before near-duplicate reuse lack the flag
+        if 'duplicate' not in {row[1] for row in conn.execute("PRAGMA table_info(inspections)")}:
+            conn.execute("ALTER TABLE inspections ADD COLUMN duplicate INTEGER NOT NULL DEFAULT 0")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        """Insert many rows in one transaction"""
+        rows = [(r['timestamp'].timestamp(), int(r['defects']), float(r['confidence']),
+                 r['status'], r['image_name'], int(bool(r.get('duplicate')))) for r in records]
+        with self._conn() as conn:
+            conn.executemany(f"INSERT INTO inspections ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def summary(self):
+        conn = self._conn()
+        total, passed, defects, confidence = conn.execute(
+            "SELECT inspections, passed, defects, confidence FROM totals WHERE id = 0").fetchone()
+        status_counts = dict(conn.execute(
+            "SELECT status, inspections FROM status_counts WHERE inspections > 0 ORDER BY inspections DESC"))
+        return {
+            'total': total,
+            'pass_rate': passed / total * 100 if total else 0.0,
+            'avg_defects': defects / total if total else 0.0,
+            'avg_confidence': confidence / total if total else 0.0,
+            'status_counts': status_counts,
+        }
+
+    def count(self, since=None):
+        if since is None:
+            return self._conn().execute("SELECT inspections FROM totals WHERE id = 0").fetchone()[0]
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM inspections WHERE ts >= ?", (since.timestamp(),)).fetchone()[0]
+
+    def recent(self, limit=100, offset=0, since=None):
+        """Newest first, served from the timestamp index"""
+        rows = self._conn().execute(
+            f"SELECT {COLUMNS} FROM inspections "
+            "WHERE ts >= ? ORDER BY ts DESC LIMIT ? OFFSET ?",
+            (since.timestamp() if since else float('-inf'), limit, offset))
+        return [_row_to_record(row) for row in rows]
+
+    def trend(self, since=None, buckets=TREND_BUCKETS):
+        """Defects per inspection, bucketed into at most `buckets` equal time slices.
+
+        Each bucket carries count and mean/min/max defects, so spikes survive
+        downsampling while the chart payload stays fixed whatever the history size.
+        """
+        conn = self._conn()
+        start = since.timestamp() if since else float('-inf')
+        first, last = conn.execute(
+            "SELECT MIN(ts), MAX(ts) FROM inspections WHERE ts >= ?", (start,)).fetchone()
+        if first is None:
+            return []
+        width = max((last - first) / buckets, 1e-3)
+        rows = conn.execute(
+            "SELECT MIN(CAST((ts - ?) / ? AS INTEGER), ?) AS bucket, COUNT(*), AVG(defects), MIN(defects), MAX(defects) "
+            "FROM inspections WHERE ts >= ? GROUP BY bucket ORDER BY bucket",
+            (first, width, buckets - 1, first))
+        return [{
+            'timestamp': datetime.fromtimestamp(first + bucket * width),
+            'inspections': count,
+            'mean': mean,
+            'min': low,
+            'max': high
+        } for bucket, count, mean, low, high in rows]
+
+    def iter_rows(self, batch_size=10000):
+        """All rows oldest first, fetched in batches"""
+        cursor = self._conn().execute(
+            f"SELECT {COLUMNS} FROM inspections ORDER BY ts")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield _row_to_record(row)
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM inspections")
+            conn.execute("DELETE FROM status_counts")
+            conn.execute("UPDATE totals SET inspections = 0, passed = 0, defects = 0, confidence = 0.0 WHERE id = 0")
@@ -0,0 +1,112 @@
+"""Bounded-memory image decoding.
+
+Uploads are probed from their header before anything is decoded, rejected when
+they exceed the byte/pixel budgets, and decoded at the smallest resolution the
+caller needs. JPEGs use draft mode (DCT scale-on-decode at 1/2, 1/4, 1/8), so a
+50 MP frame can be previewed or inferred at 640 px without ever materialising
+the full-resolution bitmap. Zoom views are cropped from power-of-two pyramid
+levels instead of upscaling the whole frame.
+"""
+import hashlib
+import io
+import os
+
+from PIL import Image
+
+MAX_UPLOAD_BYTES = int(float(os.environ.get("ALFASTACK_MAX_UPLOAD_MB", 64)) * 1024 * 1024)
+MAX_PIXELS = int(float(os.environ.get("ALFASTACK_MAX_MEGAPIXELS", 64)) * 1_000_000)
+PREVIEW_SIZE = 1280
+PYRAMID_FACTORS = (1, 2, 4, 8, 16)
+
+# Let PIL's own decompression-bomb guard agree with our budget
+Image.MAX_IMAGE_PIXELS = max(Image.MAX_IMAGE_PIXELS or 0, MAX_PIXELS)
+
+
+class ImageTooLarge(ValueError):
+    """Upload exceeds the configured byte or pixel budget"""
+
+
+def content_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def probe_image(data, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_PIXELS):
+    """Read size/mode/format from the header only and enforce the budgets"""
+    if len(data) > max_bytes:
+        raise ImageTooLarge(f"File is {len(data) / 1024 / 1024:.1f} MB; the limit is {max_bytes / 1024 / 1024:.0f} MB")
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        # PIL refuses anything beyond twice MAX_IMAGE_PIXELS before we see its size
+        raise ImageTooLarge(f"Image is far above the {max_pixels / 1e6:.0f} MP limit") from e
+    with img:
+        width, height = img.size
+        info = {'size': (width, height), 'mode': img.mode, 'format': img.format, 'bytes': len(data)}
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"Image is {width * height / 1e6:.1f} MP; the limit is {max_pixels / 1e6:.0f} MP")
+    return info
+
+
+def decode_at_least(data, min_size=None):
+    """Decode to RGB with both sides >= min_size (w, h) where possible.
+
+    Returns (image, factor) with factor = original width / decoded width.
+    min_size=None decodes at full resolution.
+    """
+    img = Image.open(io.BytesIO(data))
+    original_width = img.size[0]
+    if min_size is not None:
+        # No-op for non-JPEG formats
+        img.draft('RGB', min_size)
+        reduce_by = int(min(img.size[0] / min_size[0], img.size[1] / min_size[1]))
+        img = img.convert('RGB')
+        if reduce_by >= 2:
+            img = img.reduce(reduce_by)
+    else:
+        img = img.convert('RGB')
+    return img, original_width / img.size[0]
+
+
+def decode_for_inference(data, info, imgsz=640):
+    """Smallest decode whose longest side still covers the inference size (full-res if imgsz is None)"""
+    if imgsz is None:
+        return decode_at_least(data)
+    width, height = info['size']
+    scale = min(1.0, imgsz / max(width, height))
+    return decode_at_least(data, (max(1, int(width * scale)), max(1, int(height * scale))))
+
+
+def decode_preview(data, info, max_side=PREVIEW_SIZE):
+    """Display-resolution preview"""
+    image, _ = decode_for_inference(data, info, max_side)
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def pyramid_factor(info, zoom, display_width):
+    """Largest power-of-two reduction that still has display_width pixels across the zoomed crop"""
+    crop_width = info['size'][0] / zoom
+    needed = max(1.0, crop_width / display_width)
+    return max([f for f in PYRAMID_FACTORS if f <= needed] or [1])
+
+
+def decode_level(data, info, factor):
+    """Pyramid level: the image decoded at 1/factor resolution"""
+    width, height = info['size']
+    if factor == 1:
+        return decode_at_least(data)[0]
+    return decode_at_least(data, (max(1, width // factor), max(1, height // factor)))[0]
+
+
+def zoom_crop(level, info, zoom, display_width):
+    """Centre crop for the zoom level, rendered at (at most) display width"""
+    factor = info['size'][0] / level.size[0]
+    crop_w = info['size'][0] / zoom / factor
+    crop_h = info['size'][1] / zoom / factor
+    cx, cy = level.size[0] / 2, level.size[1] / 2
+    box = (int(cx - crop_w / 2), int(cy - crop_h / 2), int(cx + crop_w / 2), int(cy + crop_h / 2))
+    crop = level.crop(box)
+    if crop.size[0] > display_width:
+        crop = crop.resize((display_width, max(1, int(crop.size[1] * display_width / crop.size[0]))),
+                           Image.Resampling.LANCZOS)
+    return crop
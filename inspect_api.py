@@ -0,0 +1,291 @@
+"""REST inspection endpoint served by the Flask health service (cron-job.py).
+
+POST /inspect with one or more images as multipart ``image`` fields (or a raw
+image body). All requests share one model behind a MicroBatcher. GET /metrics
+serves Prometheus text and GET /ready turns 200 once a warm-up inference has
+succeeded. Settings come from the environment:
+
+    ALFASTACK_WEIGHTS       model weights (yolov8n.pt)
+    ALFASTACK_BACKEND       pytorch | onnx | onnx-int8 | openvino
+    ALFASTACK_MAX_BATCH     frames per model call (8)
+    ALFASTACK_MAX_WAIT_MS   batching window in milliseconds (10)
+    ALFASTACK_MAX_QUEUE     queued frames before requests get 429 (64)
+
+A single-image request gets 400 for bad input, 413 for an oversized image,
+500 when inference fails and 503 when the model is not ready or inference
+times out. A multipart batch larger than the queue can never be accepted, so
+it gets 413 instead of 429.
+"""
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+from flask import Blueprint, Response, jsonify, request
+
+from backends import DEFAULT_BACKEND, load_backend
+from image_io import ImageTooLarge, decode_for_inference, probe_image
+from inspector import DEFAULT_WEIGHTS, build_inspection, json_record, prepare_image
+from instrumentation import PERCENTILES, Instrumentation, process_rss_bytes
+from micro_batcher import MicroBatcher, QueueFull
+
+REQUEST_TIMEOUT = 30
+RETRY_AFTER_SECONDS = 1
+
+inspect_api = Blueprint("inspect_api", __name__)
+instrumentation = Instrumentation()
+
+# Model lifecycle: not loaded -> loading -> warming up -> ready (or failed)
+model_state = {
+    'state': "not loaded",
+    'weights': os.environ.get("ALFASTACK_WEIGHTS", DEFAULT_WEIGHTS),
+    'backend': os.environ.get("ALFASTACK_BACKEND", DEFAULT_BACKEND),
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'error': None,
+}
+STARTED_AT = time.time()
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Load the shared model, start the batcher and run one warm-up frame on first use"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            try:
+                model_state['state'] = "loading"
+                start = time.perf_counter()
+                model = load_backend(model_state['weights'], model_state['backend'])
+                model_state['load_seconds'] = time.perf_counter() - start
+                model_state['state'] = "warming up"
+                start = time.perf_counter()
+                model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+                model_state['warmup_seconds'] = time.perf_counter() - start
+                batcher = MicroBatcher(
+                    model,
+                    max_batch=int(os.environ.get("ALFASTACK_MAX_BATCH", 8)),
+                    max_wait=float(os.environ.get("ALFASTACK_MAX_WAIT_MS", 10)) / 1000,
+                    max_queue=int(os.environ.get("ALFASTACK_MAX_QUEUE", 64)),
+                    instrumentation=instrumentation,
+                )
+            except Exception as e:
+                model_state['state'] = "failed"
+                model_state['error'] = str(e)
+                instrumentation.increment('model load failures')
+                raise
+            _batcher = batcher
+            model_state['state'] = "ready"
+            model_state['error'] = None
+        return _batcher
+
+
+def start_background_load():
+    """Load and warm the model off the request path so /ready flips once it can serve"""
+    def load():
+        try:
+            get_batcher()
+        except Exception as e:
+            print(f"❌ Model load failed: {e}")
+
+    thread = threading.Thread(target=load, name="model-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    return model_state['state'] == "ready"
+
+
+def service_status():
+    """Health payload: model state, traffic counters, latency percentiles, memory"""
+    latency = {}
+    for stage, (count, total, quantiles) in instrumentation.snapshot().items():
+        latency[stage] = dict({f"p{q}_ms": round(v * 1000, 2) for q, v in zip(PERCENTILES, quantiles)},
+                              count=count, mean_ms=round(total / count * 1000, 2) if count else 0.0)
+    return {
+        "ready": is_ready(),
+        "model": dict(model_state),
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "rss_mb": round(process_rss_bytes() / 1024 / 1024, 1),
+        "counters": instrumentation.counters(),
+        "batcher": _batcher.stats() if _batcher is not None else None,
+        "latency": latency,
+    }
+
+
+def _prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Service metrics in the Prometheus text exposition format"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_prometheus_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    model_labels = {'weights': model_state['weights'], 'backend': model_state['backend']}
+    metric("alfastack_model_ready", "gauge", "1 once the model is loaded and warmed up",
+           [(model_labels, int(is_ready()))])
+    metric("alfastack_model_load_seconds", "gauge", "Time taken to load the model",
+           [(model_labels, model_state['load_seconds'] or 0)])
+    metric("alfastack_model_warmup_seconds", "gauge", "Time taken by the warm-up inference",
+           [(model_labels, model_state['warmup_seconds'] or 0)])
+
+    snapshot = instrumentation.snapshot()
+    samples = []
+    for stage, (count, total, quantiles) in snapshot.items():
+        samples += [({'stage': stage, 'quantile': q / 100}, v) for q, v in zip(PERCENTILES, quantiles)]
+    metric("alfastack_stage_latency_seconds", "summary",
+           f"Per-stage latency over the last {instrumentation.window} samples", samples)
+    for stage, (count, total, _) in snapshot.items():
+        lines.append(f'alfastack_stage_latency_seconds_sum{{stage="{_prometheus_label(stage)}"}} {total}')
+        lines.append(f'alfastack_stage_latency_seconds_count{{stage="{_prometheus_label(stage)}"}} {count}')
+
+    counters = instrumentation.counters()
+    metric("alfastack_requests_total", "counter", "Inspection requests received",
+           [({}, counters.get('requests', 0))])
+    metric("alfastack_images_processed_total", "counter", "Images inspected successfully",
+           [({}, counters.get('images processed', 0))])
+    metric("alfastack_errors_total", "counter", "Failed images and requests by kind",
+           [({'kind': name[:-len(" errors")]}, value) for name, value in counters.items()
+            if name.endswith(" errors")])
+
+    stats = _batcher.stats() if _batcher is not None else {}
+    metric("alfastack_queue_depth", "gauge", "Frames waiting for the inference worker",
+           [({}, stats.get('queue_depth', 0))])
+    metric("alfastack_queue_capacity", "gauge", "Frames that may wait before requests are rejected",
+           [({}, stats.get('queue_capacity', 0))])
+    metric("alfastack_batches_total", "counter", "Batched model calls", [({}, stats.get('batches', 0))])
+    metric("alfastack_rejected_total", "counter", "Frames rejected with 429 because the queue was full",
+           [({}, stats.get('rejected', 0))])
+    metric("alfastack_process_resident_memory_bytes", "gauge", "Resident set size of the service",
+           [({}, process_rss_bytes())])
+    return "\n".join(lines) + "\n"
+
+
+@inspect_api.route('/metrics')
+def metrics():
+    return Response(prometheus_text(), mimetype="text/plain; version=0.0.4")
+
+
+@inspect_api.route('/ready')
+def ready():
+    """Readiness: 503 until a warm-up inference has succeeded"""
+    return jsonify({"ready": is_ready(), "model": dict(model_state)}), 200 if is_ready() else 503
+
+
+def _uploaded_images():
+    """(name, bytes) for every multipart image field, or the raw request body"""
+    files = request.files.getlist("image") or list(request.files.values())
+    if files:
+        return [(f.filename or f"image{i}", f.read()) for i, f in enumerate(files)]
+    if request.data:
+        return [(request.args.get("name", "image"), request.data)]
+    return []
+
+
+def _flag(name, default):
+    value = request.values.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+@inspect_api.route('/inspect', methods=['POST'])
+def inspect():
+    request_start = time.perf_counter()
+    instrumentation.increment('requests')
+    uploads = _uploaded_images()
+    if not uploads:
+        instrumentation.increment('request errors')
+        return jsonify({"error": "No image provided; send multipart 'image' field(s) or a raw image body"}), 400
+    try:
+        confidence = float(request.values.get("conf", 0.6))
+    except ValueError:
+        instrumentation.increment('request errors')
+        return jsonify({"error": "conf must be a number"}), 400
+    enhance = _flag("enhance", True)
+    if model_state['state'] in ("loading", "warming up"):
+        # Another thread is loading the model; don't hold the request until it finishes
+        response = jsonify({"error": f"Model is {model_state['state']}", "model": dict(model_state)})
+        response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+        return response, 503
+    try:
+        batcher = get_batcher()
+    except Exception as e:
+        return jsonify({"error": f"Model unavailable: {e}"}), 503
+    names = batcher.model.names
+    capacity = batcher.stats()['queue_capacity']
+    if len(uploads) > capacity:
+        instrumentation.increment('request errors')
+        return jsonify({"error": f"{len(uploads)} images in one request; at most {capacity} fit in the inference "
+                                 "queue - split the batch"}), 413
+
+    # Decode and preprocess in the request thread; only inference is batched
+    pending = []
+    for name, data in uploads:
+        try:
+            with instrumentation.stage('decode'):
+                info = probe_image(data)
+                image, decode_factor = decode_for_inference(data, info)
+            with instrumentation.stage('preprocess'):
+                image_np, scale = prepare_image(image, enhance)
+            del image
+        except ImageTooLarge as e:
+            instrumentation.increment('oversize errors')
+            pending.append((name, None, None, {"image_name": name, "error": str(e), "status_code": 413}))
+            continue
+        except Exception as e:
+            instrumentation.increment('decode errors')
+            pending.append((name, None, None, {"image_name": name, "error": f"Unreadable image: {e}",
+                                               "status_code": 400}))
+            continue
+        try:
+            future = batcher.submit(image_np)
+        except QueueFull as e:
+            for *_, queued in pending:
+                if not isinstance(queued, dict):
+                    queued.cancel()
+            response = jsonify({"error": str(e)})
+            response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+            return response, 429
+        pending.append((name, info, decode_factor / scale, future))
+
+    records = []
+    for name, info, factor, outcome in pending:
+        if isinstance(outcome, dict):
+            records.append(outcome)
+            continue
+        try:
+            detections = outcome.result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeout:
+            instrumentation.increment('timeout errors')
+            records.append({"image_name": name, "error": f"Inference timed out after {REQUEST_TIMEOUT} s",
+                            "status_code": 503})
+            continue
+        except Exception as e:
+            instrumentation.increment('inference errors')
+            records.append({"image_name": name, "error": f"Inference failed: {e}", "status_code": 500})
+            continue
+        detections = detections.rescale(factor).filter(confidence)
+        inspection = build_inspection(info['size'], name, None, names, detections)
+        records.append(json_record(inspection, names))
+        instrumentation.increment('images processed')
+    instrumentation.record('request', time.perf_counter() - request_start)
+
+    if len(uploads) == 1:
+        record = records[0]
+        status_code = record.pop("status_code", 500) if "error" in record else 200
+        return jsonify(record), status_code
+    for record in records:
+        record.pop("status_code", None)
+    return jsonify({"results": records, "count": len(records)}), 200
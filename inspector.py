@@ -0,0 +1,278 @@
+"""Headless inspection engine shared by the Streamlit app and the batch CLI."""
+import glob
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from detections import Detections
+from preprocess import INFERENCE_SIZE, preprocess
+
+DEFAULT_WEIGHTS = 'yolov8n.pt'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+# Lowest threshold the UI offers; detections are computed once at this level
+FLOOR_CONFIDENCE = 0.1
+
+
+def load_yolo(weights=DEFAULT_WEIGHTS):
+    """Load a YOLO model (imported lazily so the engine stays light to import)"""
+    from ultralytics import YOLO
+    return YOLO(weights)
+
+
+def enhance_image(image_np):
+    """Reference PIL sharpness + contrast enhancement (see preprocess.enhance_fused)"""
+    pil_image = Image.fromarray(image_np)
+    enhancer = ImageEnhance.Sharpness(pil_image)
+    pil_image = enhancer.enhance(1.5)
+    enhancer = ImageEnhance.Contrast(pil_image)
+    pil_image = enhancer.enhance(1.2)
+    return np.array(pil_image)
+
+
+def get_verdict(defect_count):
+    return "❌ REJECT" if defect_count > 0 else "✅ PASS"
+
+
+def build_report(image_name, image_size, detections, names):
+    """Plain-text inspection report"""
+    report_text = f"AlfaStack AI Inspector Report\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    report_text += f"Image: {image_name}\nDimensions: {image_size[0]}x{image_size[1]}\n\n"
+    report_text += f"Defects Detected: {len(detections)}\n"
+
+    if len(detections):
+        report_text += "\nDefect Details:\n"
+        report_text += "".join(
+            f"{i}. {class_name} (Confidence: {conf:.1%})\n"
+            for i, (class_name, conf) in enumerate(zip(detections.class_names(names), detections.conf.tolist()), 1)
+        )
+    return report_text
+
+
+def prepare_image(image, enhance=True, imgsz=INFERENCE_SIZE):
+    """PIL image -> (numpy array ready for the model, scale from original pixels).
+
+    Downscales to the inference resolution before the fused enhancement; pass
+    imgsz=None to keep full resolution.
+    """
+    return preprocess(image, enhance, imgsz)
+
+
+def build_inspection(image_size, image_name, result, names, detections=None, scale=1.0):
+    """Turn one YOLO result into the inspection dict used by the UI, CLI and history.
+
+    image_size is the original (width, height); scale maps original pixels to
+    the coordinates of result.
+    """
+    if detections is None:
+        detections = Detections.from_result(result).rescale(1 / scale)
+    defect_count = len(detections)
+    return {
+        'image_name': image_name,
+        'image_size': image_size,
+        'results': [result] if result is not None else [],
+        'detections': detections,
+        'defects': defect_count,
+        'confidence': detections.mean_confidence,
+        'total_area': detections.total_area,
+        'status': get_verdict(defect_count),
+        'report': build_report(image_name, image_size, detections, names),
+        'timestamp': datetime.now(),
+    }
+
+
+def detect(model, image, enhance=True, floor=FLOOR_CONFIDENCE, tiling=None, decode_factor=1.0, progress=None,
+           reference=None):
+    """Run the model once at the floor confidence.
+
+    With a tiling config (see tiling.DEFAULT_TILING) the image is inspected as
+    overlapping full-resolution tiles. With a golden_reference.ReferenceGate
+    only the regions that differ from the reference are inspected; the gate
+    decision is returned as timings['reference']. decode_factor is original pixels per
+    pixel of image when it was decoded at reduced size (image_io). progress,
+    if given, is called with each stage name as it starts. Returns
+    (result, raw detections in original pixels, timings).
+    """
+    if progress:
+        progress('preprocess')
+    start = time.perf_counter()
+    image_np, scale = prepare_image(image, enhance, None if tiling else INFERENCE_SIZE)
+    timings = {'preprocess': time.perf_counter() - start}
+    if progress:
+        progress('inference')
+    if tiling:
+        from tiling import tiled_detect
+        detections, tile_timings = tiled_detect(model, image_np, floor, **tiling)
+        timings.update(tile_timings)
+        return detections.to_result(image_np, model.names), detections.rescale(decode_factor), timings
+    if reference is not None:
+        from golden_reference import gated_detect
+        (detections,), (gate,), gate_timings = gated_detect(model, [image], [image_np], reference, floor)
+        timings.update(gate_timings, reference=gate)
+        return detections.to_result(image_np, model.names), detections.rescale(decode_factor / scale), timings
+
+    start = time.perf_counter()
+    results = model(image_np, conf=floor, verbose=False)
+    timings['inference'] = time.perf_counter() - start
+    result = results[0] if len(results) > 0 else None
+    # The result (and its plot) stays at inference resolution; measurements use original pixels
+    return result, Detections.from_result(result).rescale(decode_factor / scale), timings
+
+
+def inspect_image(model, image, confidence=0.6, enhance=True, image_name="image"):
+    """Run one full inspection: enhance -> YOLO -> metrics -> report"""
+    image_np, scale = prepare_image(image, enhance)
+    results = model(image_np, conf=confidence, verbose=False)
+    result = results[0] if len(results) > 0 else None
+    return build_inspection(image.size, image_name, result, model.names, scale=scale)
+
+
+def reuse_detections(stored, image_size, image_np, scale, names):
+    """Detections of a near-duplicate entry for an image of image_size -> (result on image_np, detections).
+
+    stored holds detections in the original pixels of an image of stored['size'];
+    scale maps this image's original pixels to image_np.
+    """
+    # Same scene, possibly resubmitted at another resolution
+    detections = stored['detections'].rescale(image_size[0] / stored['size'][0])
+    return detections.rescale(scale).to_result(image_np, names), detections
+
+
+def inspect_batch(model, named_images, confidence=0.6, enhance=True, batch_size=8, duplicates=None,
+                  reference=None):
+    """Inspect (name, image) pairs, feeding the model batch_size frames per call.
+
+    Items may carry a third element, the decode factor of a reduced-size decode
+    (see image_io.decode_for_inference), and a fourth, the content digest of
+    the upload bytes. Accepts any iterable and yields
+    inspections as each batch completes, so at most batch_size decoded images
+    are held at once. With a duplicates scope (dedup_index.DuplicateScope),
+    resubmissions (or, if the scope is fuzzy, near-duplicates) of earlier
+    images reuse their detections instead of being sent to the model and are
+    flagged with 'duplicate'. With a reference gate
+    (golden_reference.ReferenceGate) only changed regions are inspected and
+    each inspection carries its gate decision as 'gate'.
+    """
+    batch_size = max(1, int(batch_size))
+    named_images = iter(named_images)
+    while True:
+        chunk = list(islice(named_images, batch_size))
+        if not chunk:
+            return
+        prepared = [prepare_image(item[1], enhance) for item in chunk]
+        hashes = [duplicates.hash(item[1]) for item in chunk] if duplicates else [None] * len(chunk)
+        # Digest of the upload bytes when the caller has them, of the decoded pixels otherwise
+        digests = [(item[3] if len(item) > 3 else duplicates.digest(item[1])) if duplicates else None
+                   for item in chunk]
+        matches = ([duplicates.find(h, d) for h, d in zip(hashes, digests)] if duplicates
+                   else [None] * len(chunk))
+        fresh = [i for i, match in enumerate(matches) if match is None]
+        gates = iter([])
+        if not fresh:
+            results = iter([])
+        elif reference is not None:
+            from golden_reference import gated_detect
+            frames = [prepared[i][0] for i in fresh]
+            detections, gate_list, _ = gated_detect(model, [chunk[i][1] for i in fresh], frames, reference,
+                                                    confidence, batch_size)
+            results = iter([d.to_result(frame, model.names) for d, frame in zip(detections, frames)])
+            gates = iter(gate_list)
+        else:
+            results = iter(model([prepared[i][0] for i in fresh], conf=confidence, verbose=False))
+        for item, (image_np, scale), image_hash, digest, match in zip(chunk, prepared, hashes, digests, matches):
+            name, image = item[:2]
+            decode_factor = item[2] if len(item) > 2 else 1.0
+            original_size = (round(image.size[0] * decode_factor), round(image.size[1] * decode_factor))
+            if match is None:
+                inspection = build_inspection(original_size, name, next(results), model.names,
+                                              scale=scale / decode_factor)
+                if reference is not None:
+                    inspection['gate'] = next(gates)
+                if duplicates:
+                    duplicates.add(image_hash, {'detections': inspection['detections'], 'image_name': name,
+                                                'size': original_size}, digest)
+            else:
+                stored, distance = match
+                result, detections = reuse_detections(stored, original_size, image_np, scale / decode_factor,
+                                                      model.names)
+                inspection = build_inspection(original_size, name, result, model.names, detections)
+                inspection.update(duplicate=True, duplicate_of=stored['image_name'], hash_distance=distance)
+            yield inspection
+
+
+def history_record(inspection):
+    """Compact row stored in the analysis history"""
+    return {
+        'timestamp': inspection['timestamp'],
+        'defects': inspection['defects'],
+        'confidence': inspection['confidence'],
+        'status': inspection['status'],
+        'image_name': inspection['image_name'],
+        'duplicate': inspection.get('duplicate', False)
+    }
+
+
+def json_record(inspection, names):
+    """JSON-serialisable summary with per-object measurements (CLI and REST output)"""
+    record = history_record(inspection)
+    record['timestamp'] = record['timestamp'].isoformat()
+    record['width'], record['height'] = inspection['image_size']
+    record['total_area'] = inspection['total_area']
+    record['objects'] = inspection['detections'].records(names)
+    return record
+
+
+# ---- Streaming batch pipeline ----
+
+def iter_image_paths(target):
+    """Yield image paths from a directory (recursively) or a glob pattern"""
+    if os.path.isdir(target):
+        for root, _, files in os.walk(target):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+    else:
+        for path in sorted(glob.iglob(target, recursive=True)):
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                yield path
+
+
+def iter_decoded(paths):
+    """Decode images one at a time; unreadable files are yielded as errors"""
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                image = img.convert('RGB')
+        except Exception as e:
+            yield path, None, str(e)
+            continue
+        yield path, image, None
+
+
+def inspect_stream(model, paths, confidence=0.6, enhance=True, batch_size=1):
+    """Generator pipeline: decode -> enhance -> YOLO -> metrics, one record per image.
+
+    Only the current batch of decoded images is held in memory.
+    """
+    errors = []
+
+    def decoded():
+        for path, image, error in iter_decoded(paths):
+            if error is not None:
+                errors.append({'path': path, 'image_name': os.path.basename(path), 'error': error})
+                continue
+            yield path, image
+
+    for inspection in inspect_batch(model, decoded(), confidence, enhance, batch_size):
+        while errors:
+            yield errors.pop(0)
+        path = inspection['image_name']
+        record = json_record(inspection, model.names)
+        record['image_name'] = os.path.basename(path)
+        record['path'] = path
+        yield record
+    while errors:
+        yield errors.pop(0)
@@ -0,0 +1,139 @@
+"""Per-stage latency instrumentation.
+
+Each pipeline stage (decode, preprocess, inference, plot, ...) records its
+wall time into a rolling window; percentiles are computed over the most recent
+samples so the numbers track the current model/backend rather than all-time
+history. Counters track events such as images processed and errors.
+``profile_call`` runs one call under cProfile for a deeper look.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WINDOW_SIZE = 1024
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Rolling window of latency samples plus all-time count and total"""
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, qs=PERCENTILES):
+        if not self.samples:
+            return [0.0] * len(qs)
+        return np.percentile(np.fromiter(self.samples, dtype=np.float64), qs).tolist()
+
+
+class Instrumentation:
+    """Thread-safe registry of stage histograms and event counters, in first-recorded order"""
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.window = window
+        self._stages = OrderedDict()
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, counter, n=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = LatencyHistogram(self.window)
+            histogram.add(seconds)
+
+    def record_timings(self, timings, prefix=""):
+        """Record every float entry of a timings dict (as returned by inspector.detect)"""
+        for stage, seconds in timings.items():
+            if isinstance(seconds, float):
+                self.record(prefix + stage, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """{stage: (count, total seconds, [p50, p95, p99] seconds)}"""
+        with self._lock:
+            return {stage: (h.count, h.total, h.percentiles()) for stage, h in self._stages.items()}
+
+    def stats(self):
+        """Rows for the Settings performance panel"""
+        rows = []
+        for stage, (count, total, (p50, p95, p99)) in self.snapshot().items():
+            rows.append({
+                'Stage': stage,
+                'Count': count,
+                'p50 (ms)': round(p50 * 1000, 1),
+                'p95 (ms)': round(p95 * 1000, 1),
+                'p99 (ms)': round(p99 * 1000, 1),
+                'Mean (ms)': round(total / count * 1000, 1) if count else 0.0
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+
+def process_rss_bytes():
+    """Current resident set size from /proc, falling back to peak RSS from getrusage"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def profile_call(func, *args, top=30, **kwargs):
+    """Run func under cProfile.
+
+    Returns (result, text report of the top functions by cumulative time,
+    .prof bytes loadable with pstats / snakeviz).
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    profiler.create_stats()
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats("cumulative").print_stats(top)
+    return result, text.getvalue(), marshal.dumps(stats.stats)
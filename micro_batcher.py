@@ -0,0 +1,118 @@
+"""Dynamic micro-batching for concurrent inference requests.
+
+Request threads decode and preprocess their own images, then enqueue the
+prepared frames. A single worker thread owns the model: it takes the first
+waiting frame, keeps collecting until ``max_batch`` frames are queued or
+``max_wait`` seconds have passed, and runs them as one model call. Under load
+batches fill up and throughput scales with concurrency; when idle a request
+waits at most ``max_wait`` extra. A full queue is reported to the caller
+instead of growing without bound.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from detections import Detections
+from inspector import FLOOR_CONFIDENCE
+
+_STOP = object()
+
+
+class QueueFull(RuntimeError):
+    """The batcher queue is at capacity; the caller should retry later"""
+
+
+class MicroBatcher:
+    """Coalesce submitted frames into batched model calls on one worker thread"""
+
+    def __init__(self, model, max_batch=8, max_wait=0.01, max_queue=64, floor=FLOOR_CONFIDENCE,
+                 instrumentation=None):
+        self.model = model
+        self.instrumentation = instrumentation
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.floor = floor
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.rejected = 0
+        self.largest_batch = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image_np):
+        """Queue one prepared frame; returns a Future resolving to raw Detections"""
+        future = Future()
+        try:
+            self._queue.put_nowait((image_np, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(f"Inference queue is full ({self._queue.maxsize} frames waiting)")
+        return future
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'batches': self.batches,
+                'images': self.images,
+                'rejected': self.rejected,
+                'largest_batch': self.largest_batch,
+                'avg_batch': self.images / self.batches if self.batches else 0.0
+            }
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _collect(self):
+        """First waiting item, plus whatever else arrives within max_wait"""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch and items[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            stop = items[-1] is _STOP
+            if stop:
+                items.pop()
+            items = [item for item in items if item[1].set_running_or_notify_cancel()]
+            if items:
+                self._infer(items)
+            if stop:
+                return
+
+    def _infer(self, items):
+        start = time.perf_counter()
+        try:
+            results = self.model([image_np for image_np, _, _ in items], conf=self.floor, verbose=False)
+        except Exception as e:
+            for _, future, _ in items:
+                future.set_exception(e)
+            return
+        if self.instrumentation is not None:
+            for _, _, enqueued in items:
+                self.instrumentation.record('queue wait', start - enqueued)
+            self.instrumentation.record('batch inference', time.perf_counter() - start)
+        with self._lock:
+            self.batches += 1
+            self.images += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+        for (_, future, _), result in zip(items, results):
+            future.set_result(Detections.from_result(result))
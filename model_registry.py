@@ -0,0 +1,176 @@
+"""Lazy, memory-bounded pool of YOLO models with warm-up and latency stats."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from backends import DEFAULT_BACKEND, load_backend
+
+MODEL_CATALOG = {
+    "YOLOv8 Nano (Default)": "yolov8n.pt",
+    "YOLOv8 Small": "yolov8s.pt",
+    "YOLOv8 Medium": "yolov8m.pt",
+    "YOLOv8 Large": "yolov8l.pt",
+}
+DEFAULT_MODEL_OPTION = "YOLOv8 Nano (Default)"
+
+
+def model_key(weights, backend=DEFAULT_BACKEND, threads=None):
+    return f"{weights}|{backend}|{threads or 'auto'}"
+
+
+def model_nbytes(model):
+    """Parameter + buffer bytes of a loaded model (exported graph size for ONNX backends)"""
+    onnx_path = getattr(model, 'onnx_path', None)
+    if onnx_path is not None:
+        return os.path.getsize(onnx_path)
+    torch_model = getattr(model, 'model', None)
+    if torch_model is None or not hasattr(torch_model, 'parameters'):
+        return 0
+    tensors = list(torch_model.parameters()) + list(torch_model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """Loads weights on first use and keeps at most max_models resident under max_bytes"""
+
+    def __init__(self, loader=load_backend, max_models=2, max_bytes=1024 * 1024 * 1024, warmup_size=640):
+        self.loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.warmup_size = warmup_size
+        self._models = OrderedDict()
+        self._stats = {}
+        self._pending = {}  # key -> in-flight (or failed) load; finished loads are dropped so eviction frees the model
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # One loader thread: models warm in the background one at a time
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+    def _stat(self, key):
+        return self._stats.setdefault(key, {
+            'load_time': None,
+            'warmup_time': None,
+            'loads': 0,
+            'calls': 0,
+            'images': 0,
+            'total_latency': 0.0,
+            'bytes': 0,
+        })
+
+    def _resident(self, key):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+        return None
+
+    def get(self, weights, backend=DEFAULT_BACKEND, threads=None):
+        key = model_key(weights, backend, threads)
+        model = self._resident(key)
+        if model is not None:
+            return model
+
+        # Loads are serialised, but stats/lookups (self._lock) stay available meanwhile
+        with self._load_lock:
+            model = self._resident(key)
+            if model is not None:
+                return model
+
+            start = time.perf_counter()
+            model = self.loader(weights, backend, threads)
+            load_time = time.perf_counter() - start
+
+            # Warm-up so the first user request doesn't pay for lazy initialisation
+            start = time.perf_counter()
+            model(np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8), verbose=False)
+            warmup_time = time.perf_counter() - start
+
+            nbytes = model_nbytes(model)
+            with self._lock:
+                stat = self._stat(key)
+                stat.update(load_time=load_time, warmup_time=warmup_time, bytes=nbytes)
+                stat['loads'] += 1
+                # A direct load succeeded, so an earlier failed background load no longer stands
+                failed = self._pending.get(key)
+                if failed is not None and failed.done() and failed.exception() is not None:
+                    del self._pending[key]
+
+                self._models[key] = (model, nbytes)
+                self._evict(keep=key)
+            return model
+
+    def load_async(self, weights, backend=DEFAULT_BACKEND, threads=None):
+        """Future for the model, loading and warming it on the background thread if needed.
+
+        A failed load is reported once (its future holds the exception) and the next
+        call loads again, so a transient failure (download timeout, brief OOM) does
+        not stick. A missing backend dependency (ImportError) stays failed until
+        get() is called directly. An evicted model is loaded again.
+        """
+        key = model_key(weights, backend, threads)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                # The caller's own future, so the registry holds no reference beyond _models
+                future = Future()
+                future.set_result(entry[0])
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                if future.done() and not isinstance(future.exception(), ImportError):
+                    del self._pending[key]
+                return future
+            future = self._pending[key] = self._loader.submit(self.get, weights, backend, threads)
+        # Outside the lock: the callback runs right away if the load already finished
+        future.add_done_callback(lambda done: self._settled(key, done))
+        return future
+
+    def _settled(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future and future.exception() is None:
+                del self._pending[key]
+
+    def _evict(self, keep):
+        resident = sum(nbytes for _, nbytes in self._models.values())
+        while len(self._models) > 1 and (len(self._models) > self.max_models or resident > self.max_bytes):
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            _, nbytes = self._models.pop(oldest)
+            resident -= nbytes
+
+    def record_latency(self, key, seconds, images=1):
+        with self._lock:
+            stat = self._stat(key)
+            stat['calls'] += 1
+            stat['images'] += images
+            stat['total_latency'] += seconds
+
+    def is_resident(self, key):
+        return key in self._models
+
+    def stats(self):
+        with self._lock:
+            options = {weights: option for option, weights in MODEL_CATALOG.items()}
+            rows = []
+            for key, stat in self._stats.items():
+                weights, backend, threads = key.split('|')
+                images = stat['images']
+                rows.append({
+                    'Model': options.get(weights, weights),
+                    'Backend': backend,
+                    'Threads': threads,
+                    'Resident': key in self._models,
+                    'Load Time (s)': stat['load_time'],
+                    'Warm-up (s)': stat['warmup_time'],
+                    'Loads': stat['loads'],
+                    'Images': images,
+                    'Avg Latency (ms)': stat['total_latency'] / images * 1000 if images else None,
+                    'Memory (MB)': stat['bytes'] / 1024 / 1024,
+                })
+            return rows
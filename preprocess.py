@@ -0,0 +1,92 @@
+"""Downscale-first, fused sharpen + contrast preprocessing.
+
+The PIL path (``inspector.enhance_image``) enhances the full-resolution frame
+through several full-size copies and YOLO then throws most of those pixels
+away. Here the frame is first resized to the inference resolution into a
+per-thread scratch buffer, then sharpness and contrast are applied as a single
+OpenCV convolution:
+
+    contrast(sharpen(x)) = c * (K * x) + (1 - c) * mean
+                         = (c * K) * x + (1 - c) * mean
+
+where K = s * identity + (1 - s) * SMOOTH is PIL's sharpness kernel. The
+luminance mean is taken from the resized input (K sums to 1, so it matches the
+sharpened mean up to clipping), so the output needs one pass and one allocation.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+INFERENCE_SIZE = 640
+SHARPNESS = 1.5
+CONTRAST = 1.2
+
+# PIL ImageFilter.SMOOTH
+_SMOOTH = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+_IDENTITY = np.zeros((3, 3), dtype=np.float32)
+_IDENTITY[1, 1] = 1
+_LUMA = (0.299, 0.587, 0.114)
+
+_scratch = threading.local()
+
+
+def _scratch_buffer(shape):
+    """Per-thread resize buffer, reallocated only when the target shape changes"""
+    buf = getattr(_scratch, 'buf', None)
+    if buf is None or buf.shape != shape:
+        buf = _scratch.buf = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def as_rgb_array(image):
+    """PIL image or array -> HxWx3 uint8 RGB array"""
+    if hasattr(image, 'mode'):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    return image[..., :3]
+
+
+def fused_kernel(sharpness=SHARPNESS, contrast=CONTRAST):
+    return contrast * (sharpness * _IDENTITY + (1 - sharpness) * _SMOOTH)
+
+
+def enhance_fused(src, sharpness=SHARPNESS, contrast=CONTRAST):
+    """Sharpen + contrast in one filter2D pass with saturating uint8 output"""
+    channel_means = cv2.mean(src)[:3]
+    mean = int(sum(w * m for w, m in zip(_LUMA, channel_means)) + 0.5)
+    delta = (1 - contrast) * mean
+    out = cv2.filter2D(src, -1, fused_kernel(sharpness, contrast), delta=delta, borderType=cv2.BORDER_REPLICATE)
+    # PIL's 3x3 filter leaves the one-pixel border unsharpened; contrast still applies there
+    for index in ((0,), (-1,), (slice(None), 0), (slice(None), -1)):
+        edge = np.ascontiguousarray(src[index])
+        out[index] = cv2.addWeighted(edge, contrast, edge, 0, delta)
+    return out
+
+
+def preprocess(image, enhance=True, imgsz=INFERENCE_SIZE):
+    """Resize to the inference resolution first, then enhance.
+
+    Returns (image_np, scale) where scale maps original pixel coordinates to
+    the returned array (boxes found on it are divided by scale). imgsz=None
+    keeps full resolution (used by tiled inference).
+    """
+    src = as_rgb_array(image)
+    height, width = src.shape[:2]
+    scale = 1.0
+    if imgsz and max(height, width) > imgsz:
+        scale = imgsz / max(height, width)
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        if enhance:
+            resized = cv2.resize(src, size, dst=_scratch_buffer((size[1], size[0], 3)), interpolation=cv2.INTER_AREA)
+        else:
+            return cv2.resize(src, size, interpolation=cv2.INTER_AREA), scale
+    else:
+        resized = src
+
+    if not enhance:
+        return np.array(resized), scale
+    return enhance_fused(resized), scale
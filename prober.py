@@ -0,0 +1,181 @@
+"""Asynchronous keep-alive and latency prober.
+
+Every target is probed on its own jittered schedule from one asyncio loop with
+a pooled aiohttp session, so connections are reused instead of reopened each
+round. Response times are kept per target and slow outliers are flagged as
+cold starts (e.g. a Render instance spinning back up).
+
+Targets come from ALFASTACK_PROBE_TARGETS as comma-separated
+``name=[METHOD ]url`` entries; a POST target sends a small JPEG as the
+multipart ``image`` field, which exercises /inspect end to end.
+
+    python prober.py ui=http://127.0.0.1:8501 health=http://127.0.0.1:5000/health --interval 5 --rounds 3
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_TARGETS = "ui=https://alfastack-ai-inspector.onrender.com"
+DEFAULT_INTERVAL = 840  # 14 minutes, under Render's idle spin-down
+HISTORY_SIZE = 288
+# A probe is a cold start when it is this much slower than the target's usual response...
+COLD_START_FACTOR = 3.0
+# ...and at least this slow in absolute terms
+COLD_START_SECONDS = 2.0
+
+
+def parse_targets(spec):
+    """'name=[METHOD ]url,...' -> list of target dicts"""
+    targets = []
+    for i, entry in enumerate(e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        name, sep, rest = entry.partition("=")
+        if not sep or "://" in name or " " in name.strip():
+            name, rest = "", entry
+        parts = rest.split()
+        method, url = (parts[0].upper(), parts[1]) if len(parts) == 2 else ("GET", parts[0])
+        targets.append({'name': name.strip() or f"target{i}", 'url': url, 'method': method})
+    return targets
+
+
+def probe_image_bytes(size=64):
+    """Small grey JPEG used as the POST payload"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((size, size, 3), 128, dtype=np.uint8)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class Prober:
+    """Probe targets concurrently and keep a bounded response-time history for each"""
+
+    def __init__(self, targets, interval=DEFAULT_INTERVAL, jitter=0.1, timeout=30, history=HISTORY_SIZE):
+        self.targets = targets
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.history = {t['name']: deque(maxlen=history) for t in targets}
+        self._lock = threading.Lock()
+        self._payload = None
+
+    def _is_cold_start(self, name, seconds):
+        with self._lock:
+            usual = [r['seconds'] for r in self.history[name] if r['ok'] and not r['cold_start']]
+        if seconds < COLD_START_SECONDS:
+            return False
+        return not usual or seconds > COLD_START_FACTOR * float(np.median(usual))
+
+    async def probe(self, session, target):
+        """One request; returns and records the probe result"""
+        import aiohttp
+
+        kwargs = {}
+        if target['method'] == "POST":
+            if self._payload is None:
+                self._payload = probe_image_bytes()
+            form = aiohttp.FormData()
+            form.add_field("image", self._payload, filename="probe.jpg", content_type="image/jpeg")
+            kwargs['data'] = form
+        record = {'timestamp': time.time(), 'status': None, 'ok': False, 'cold_start': False, 'error': None}
+        start = time.perf_counter()
+        try:
+            async with session.request(target['method'], target['url'], **kwargs) as response:
+                await response.read()
+                record['status'] = response.status
+                record['ok'] = response.status < 400
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+        record['seconds'] = time.perf_counter() - start
+        if record['ok']:
+            record['cold_start'] = self._is_cold_start(target['name'], record['seconds'])
+        with self._lock:
+            self.history[target['name']].append(record)
+        return record
+
+    async def _probe_forever(self, session, target, rounds):
+        # Spread first probes so targets do not fire in lockstep
+        await asyncio.sleep(random.uniform(0, self.jitter * self.interval))
+        done = 0
+        while rounds is None or done < rounds:
+            record = await self.probe(session, target)
+            done += 1
+            status = record['status'] if record['ok'] else record['error'] or record['status']
+            print(f"{'✅' if record['ok'] else '❌'} {target['name']} {status} "
+                  f"{record['seconds'] * 1000:.0f} ms{' (cold start)' if record['cold_start'] else ''} - {time.ctime()}")
+            if rounds is None or done < rounds:
+                await asyncio.sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def run(self, rounds=None):
+        """Probe every target until cancelled (or for `rounds` probes each)"""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=self.interval * 2)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(self._probe_forever(session, t, rounds) for t in self.targets))
+
+    def start_in_thread(self):
+        """Run the event loop on a daemon thread (used by the Flask service)"""
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="prober", daemon=True)
+        thread.start()
+        return thread
+
+    def summary(self, recent=20):
+        """Per-target status, latency percentiles, cold starts and recent history"""
+        with self._lock:
+            history = {name: list(records) for name, records in self.history.items()}
+        targets = []
+        for target in self.targets:
+            records = history[target['name']]
+            ok = [r['seconds'] for r in records if r['ok']]
+            p50, p95 = np.percentile(ok, (50, 95)).tolist() if ok else (None, None)
+            last = records[-1] if records else None
+            targets.append({
+                'name': target['name'],
+                'url': target['url'],
+                'method': target['method'],
+                'probes': len(records),
+                'success_rate': len(ok) / len(records) if records else None,
+                'last_status': last['status'] if last else None,
+                'last_ok': last['ok'] if last else None,
+                'last_ms': round(last['seconds'] * 1000, 1) if last else None,
+                'p50_ms': round(p50 * 1000, 1) if ok else None,
+                'p95_ms': round(p95 * 1000, 1) if ok else None,
+                'cold_starts': sum(r['cold_start'] for r in records),
+                'history': [dict(r, seconds=round(r['seconds'], 4)) for r in records[-recent:]] if recent else []
+            })
+        return {'interval_seconds': self.interval, 'jitter': self.jitter, 'targets': targets}
+
+
+def prober_from_env():
+    return Prober(parse_targets(os.environ.get("ALFASTACK_PROBE_TARGETS", DEFAULT_TARGETS)),
+                  interval=float(os.environ.get("ALFASTACK_PROBE_INTERVAL", DEFAULT_INTERVAL)),
+                  jitter=float(os.environ.get("ALFASTACK_PROBE_JITTER", 0.1)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe AlfaStack endpoints and report response times")
+    parser.add_argument("targets", nargs="+", help="name=[METHOD ]url entries (quote entries with a method)")
+    parser.add_argument("--interval", type=float, default=10, help="seconds between probes of a target")
+    parser.add_argument("--jitter", type=float, default=0.1, help="fractional interval jitter")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--rounds", type=int, default=3, help="probes per target")
+    args = parser.parse_args(argv)
+
+    prober = Prober(parse_targets(",".join(args.targets)), args.interval, args.jitter, args.timeout)
+    asyncio.run(prober.run(args.rounds))
+    print(json.dumps(prober.summary(recent=0), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
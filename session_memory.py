@@ -0,0 +1,144 @@
+"""Bounded storage for per-session inspection artifacts.
+
+Session state only keeps compact results (detection arrays, a small JPEG
+thumbnail and an artifact key). Heavy artifacts, such as the inference frame
+that annotations are drawn on, live in one server-wide store with a byte
+budget per session and a global one. Whenever either is exceeded, the least
+recently used artifacts are evicted (the session's own first, then the
+oldest across all sessions). An evicted artifact is rebuilt by the caller
+from the upload, without running the model again, so evicting one never
+loses a result.
+
+Budgets come from ALFASTACK_SESSION_ARTIFACT_MB (default 64) and
+ALFASTACK_ARTIFACT_BUDGET_MB (default 512).
+"""
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SESSION_BUDGET = int(float(os.environ.get("ALFASTACK_SESSION_ARTIFACT_MB", 64)) * 1024 * 1024)
+GLOBAL_BUDGET = int(float(os.environ.get("ALFASTACK_ARTIFACT_BUDGET_MB", 512)) * 1024 * 1024)
+THUMBNAIL_SIZE = 256
+
+
+def make_thumbnail(image_np, size=THUMBNAIL_SIZE, quality=80):
+    """Small JPEG of an RGB array (a few KB instead of a full-resolution PIL image)"""
+    from PIL import Image
+    thumb = Image.fromarray(image_np)
+    thumb.thumbnail((size, size))
+    buffer = io.BytesIO()
+    thumb.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def estimate_nbytes(value, _seen=None):
+    """Approximate memory held by a session-state value, counting arrays and images by their buffers"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, io.IOBase) and isinstance(getattr(value, 'size', None), int):
+        # Streamlit UploadedFile
+        return value.size
+    if hasattr(value, 'nbytes') and isinstance(getattr(value, 'nbytes'), int):
+        return value.nbytes
+    if hasattr(value, 'mode') and hasattr(value, 'size') and hasattr(value, 'getbands'):
+        width, height = value.size
+        return width * height * len(value.getbands())
+    if hasattr(value, 'orig_img'):
+        # ultralytics Results: the source frame dominates
+        return estimate_nbytes(value.orig_img, seen) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k, seen) + estimate_nbytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item, seen) for item in value)
+    return sys.getsizeof(value)
+
+
+def session_state_nbytes(state):
+    """Per-key estimate for a (Streamlit) session state mapping, largest first"""
+    sizes = {key: estimate_nbytes(state[key]) for key in list(state.keys())}
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+class ArtifactStore:
+    """Thread-safe LRU of heavy per-session artifacts under per-session and global byte budgets"""
+
+    def __init__(self, session_budget=SESSION_BUDGET, global_budget=GLOBAL_BUDGET):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self._entries = OrderedDict()  # (session, key) -> (value, nbytes), least recently used first
+        self._session_bytes = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, session, key, value, nbytes):
+        with self._lock:
+            self._pop((session, key))
+            if nbytes > min(self.session_budget, self.global_budget):
+                return False
+            self._entries[(session, key)] = (value, nbytes)
+            self._session_bytes[session] = self._session_bytes.get(session, 0) + nbytes
+            self.total_bytes += nbytes
+            while self._session_bytes[session] > self.session_budget:
+                self._evict(next(k for k in self._entries if k[0] == session))
+            while self.total_bytes > self.global_budget:
+                self._evict(next(iter(self._entries)))
+            return True
+
+    def get(self, session, key):
+        with self._lock:
+            entry = self._entries.get((session, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((session, key))
+            self.hits += 1
+            return entry[0]
+
+    def _pop(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        session = entry_key[0]
+        self.total_bytes -= entry[1]
+        self._session_bytes[session] -= entry[1]
+        if not self._session_bytes[session]:
+            del self._session_bytes[session]
+
+    def _evict(self, entry_key):
+        self._pop(entry_key)
+        self.evictions += 1
+
+    def drop_session(self, session):
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == session]:
+                self._pop(entry_key)
+
+    def session_bytes(self, session):
+        with self._lock:
+            return self._session_bytes.get(session, 0)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'sessions': len(self._session_bytes),
+                'bytes': self.total_bytes,
+                'session_budget': self.session_budget,
+                'global_budget': self.global_budget,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+from golden_reference import ReferenceGate, roi_pixels
+
+
+def textured_canvas(width=800, height=600, seed=0):
+    """Smooth random texture, so phase correlation has something to lock on to"""
+    rng = np.random.default_rng(seed)
+    noise = rng.uniform(0, 255, (height, width)).astype(np.float32)
+    grey = cv2.GaussianBlur(noise, (0, 0), 6)
+    grey = cv2.normalize(grey, None, 40, 215, cv2.NORM_MINMAX).astype(np.uint8)
+    return np.dstack([grey] * 3)
+
+
+def test_shifted_defect_is_inside_a_roi():
+    canvas = textured_canvas()
+    reference = canvas[40:520, 50:690].copy()
+    # Same part moved by (+50, +40) px in the fixture, with a dark defect
+    frame = canvas[0:480, 0:640].copy()
+    defect = (350, 240, 390, 270)
+    frame[defect[1]:defect[3], defect[0]:defect[2]] = 0
+
+    gate = ReferenceGate("part", reference, 1).compare(frame)
+
+    assert gate['verdict'] == 'roi'
+    dx, dy = gate['shift']
+    assert abs(dx * 640 / 320 - 50) < 2 and abs(dy * 640 / 320 - 40) < 2
+    boxes = roi_pixels(gate, 640, 480)
+    assert any(x0 <= defect[0] and y0 <= defect[1] and x1 >= defect[2] and y1 >= defect[3]
+               for x0, y0, x1, y1 in boxes), boxes
+
+
+def test_shifted_clean_frame_is_unchanged():
+    canvas = textured_canvas()
+    reference = canvas[40:520, 50:690].copy()
+    frame = canvas[0:480, 0:640].copy()
+
+    assert ReferenceGate("part", reference, 1).compare(frame)['verdict'] == 'unchanged'
+
+
+def test_defect_near_the_valid_edge_of_a_shifted_frame_is_flagged():
+    canvas = textured_canvas()
+    reference = canvas[40:520, 50:690].copy()
+    # Shift is (+50, +40) px, so only the right/bottom band is pulled in from outside the
+    # frame; a defect just inside the left/top edge of the overlap is still real
+    frame = canvas[0:480, 0:640].copy()
+    defect = (60, 50, 90, 80)
+    frame[defect[1]:defect[3], defect[0]:defect[2]] = 0
+
+    gate = ReferenceGate("part", reference, 1).compare(frame)
+
+    assert gate['verdict'] == 'roi'
+    boxes = roi_pixels(gate, 640, 480)
+    assert any(x0 <= defect[0] and y0 <= defect[1] and x1 >= defect[2] and y1 >= defect[3]
+               for x0, y0, x1, y1 in boxes), boxes
@@ -0,0 +1,44 @@
+import pytest
+
+from model_registry import ModelRegistry
+
+
+class FakeModel:
+    names = {0: "defect"}
+
+    def __call__(self, *args, **kwargs):
+        return []
+
+
+def flaky_loader(failures, error=RuntimeError):
+    calls = []
+
+    def load(weights, backend, threads):
+        calls.append(weights)
+        if len(calls) <= failures:
+            raise error("weights download timed out")
+        return FakeModel()
+    return load, calls
+
+
+def test_failed_background_load_is_retried():
+    loader, calls = flaky_loader(failures=1)
+    registry = ModelRegistry(loader=loader)
+
+    with pytest.raises(RuntimeError):
+        registry.load_async("a.pt").result(timeout=5)
+    # The failure is reported once more, to whoever polls the finished future
+    assert registry.load_async("a.pt").exception() is not None
+
+    assert isinstance(registry.load_async("a.pt").result(timeout=5), FakeModel)
+    assert len(calls) == 2
+
+
+def test_missing_backend_dependency_stays_failed():
+    loader, calls = flaky_loader(failures=1, error=ImportError)
+    registry = ModelRegistry(loader=loader)
+
+    registry.load_async("a.pt").exception(timeout=5)
+    for _ in range(3):
+        assert isinstance(registry.load_async("a.pt").exception(), ImportError)
+    assert len(calls) == 1
@@ -0,0 +1,78 @@
+"""Sliced inference for high-resolution inspection images.
+
+The frame is cut into overlapping tiles at the model's native resolution so
+small defects are not lost to downscaling; tile detections are shifted back to
+full-image coordinates and duplicates across tile borders are merged with NMS.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import nms
+from detections import Detections
+
+DEFAULT_TILING = {
+    'tile_size': 640,
+    'overlap': 0.2,
+    'batch_size': 8,
+    'workers': 1,
+    'merge_iou': 0.5,
+}
+
+
+def tiling_spec(config):
+    """Short string identifying a tiling config (used in cache keys)"""
+    if not config:
+        return "full"
+    return f"tiles{config['tile_size']}o{config['overlap']:.2f}"
+
+
+def make_tiles(width, height, tile_size=640, overlap=0.2):
+    """Overlapping (x0, y0, x1, y1) windows covering the whole image"""
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)  # last tile flush with the edge
+        return positions
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def tiled_detect(model, image_np, confidence, tile_size=640, overlap=0.2, batch_size=8,
+                 workers=1, merge_iou=0.5):
+    """Run the model tile by tile; returns (merged Detections, per-stage timings).
+
+    workers > 1 runs tile batches concurrently, which is only safe for
+    backends whose sessions are thread-safe (ONNX Runtime / OpenVINO).
+    """
+    timings = {}
+    start = time.perf_counter()
+    height, width = image_np.shape[:2]
+    windows = make_tiles(width, height, tile_size, overlap)
+    tiles = [image_np[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+    batches = [list(range(i, min(i + batch_size, len(tiles)))) for i in range(0, len(tiles), batch_size)]
+    timings['slice'] = time.perf_counter() - start
+
+    def run_batch(indices):
+        results = model([tiles[i] for i in indices], conf=confidence, verbose=False)
+        return [Detections.from_result(r).offset(windows[i][0], windows[i][1])
+                for i, r in zip(indices, results)]
+
+    start = time.perf_counter()
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            per_batch = list(pool.map(run_batch, batches))
+    else:
+        per_batch = [run_batch(indices) for indices in batches]
+    timings['inference'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged = Detections.concat([dets for batch in per_batch for dets in batch])
+    keep = nms(merged.xyxy, merged.conf, merged.cls, merge_iou, max_det=len(merged), metric="ios")
+    merged = merged[keep]
+    timings['merge'] = time.perf_counter() - start
+    timings['tiles'] = len(tiles)
+    return merged, timings
@@ -0,0 +1,235 @@
+"""Video file and camera-stream inspection.
+
+A reader thread decodes frames into a small bounded queue while the caller
+runs batched inference on whatever is waiting. Two mechanisms keep a slow
+model in step with the source:
+
+* skipping - once inference is measurably slower than the source frame rate,
+  the reader only ``grab()``s (no colour conversion, no queueing) the frames
+  it would not be able to inspect, with the stride adapted as throughput changes;
+* dropping - in real-time mode a full queue discards its oldest frame, so the
+  frames that are inspected are always the freshest ones.
+
+Files are paced at their native frame rate in real-time mode (as if they were
+a live camera); with ``realtime=False`` every frame is inspected. Sources are
+file paths, RTSP/HTTP URLs or V4L device numbers ("0" -> /dev/video0).
+
+    python video_stream.py belt.mp4 --realtime --max-frames 300
+"""
+import argparse
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+from PIL import Image
+
+from inspector import DEFAULT_WEIGHTS, inspect_batch, json_record, load_yolo
+
+VIDEO_EXTENSIONS = ('mp4', 'avi', 'mov', 'mkv', 'webm', 'mpeg', 'mpg')
+QUEUE_SIZE = 8
+DEFAULT_FPS = 25.0
+MAX_STRIDE = 30
+_EOF = object()
+
+
+def open_capture(source):
+    """cv2.VideoCapture for a path, URL or device number"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source: {source}")
+    return capture
+
+
+def is_live(source):
+    return not (isinstance(source, str) and os.path.isfile(source))
+
+
+class FrameReader:
+    """Decode frames on a background thread into a bounded queue"""
+
+    def __init__(self, source, realtime=True, max_queue=QUEUE_SIZE, max_frames=None):
+        self.source = source
+        self.capture = open_capture(source)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.source_fps = fps if fps and 1 <= fps <= 240 else DEFAULT_FPS
+        frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.frame_count = frame_count if frame_count > 0 else None
+        self.realtime = realtime
+        # A live source cannot be paced or held back; a file is paced only in real-time mode
+        self._pace = realtime and not is_live(source)
+        self.max_frames = max_frames
+        self.stride = 1
+        self.frames_read = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        if not self.realtime:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Keep the newest frames: discard the oldest waiting one
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        start = time.perf_counter()
+        index = -1
+        try:
+            while not self._stop.is_set():
+                if self.max_frames is not None and self.frames_read >= self.max_frames:
+                    break
+                index += 1
+                if self._pace:
+                    delay = start + index / self.source_fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if index % self.stride:
+                    if not self.capture.grab():
+                        break
+                    self.skipped += 1
+                    continue
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                self.frames_read += 1
+                self._put((index, index / self.source_fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.capture.release()
+            self._put(_EOF)
+
+    def adapt(self, inspect_fps):
+        """Set the skip stride from the measured processing rate (frames/s) so inspection keeps up"""
+        if self.realtime and inspect_fps > 0:
+            self.stride = min(MAX_STRIDE, max(1, math.ceil(self.source_fps / inspect_fps)))
+
+    def batch(self, size):
+        """Block for one frame, then take up to size - 1 more that are already waiting"""
+        frames = [self._queue.get()]
+        while len(frames) < size and frames[-1] is not _EOF:
+            try:
+                frames.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return frames
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+def inspect_video(model, source, confidence=0.6, enhance=True, batch_size=4, realtime=True,
+                  max_frames=None, name=None, stats=None, duplicates=None, reference=None):
+    """Yield one inspection per inspected frame, in order.
+
+    stats (a dict, updated in place after every batch) receives frames read,
+    inspected, skipped and dropped, the source and achieved frame rates and
+    the current skip stride. duplicates and reference (a golden-reference
+    gate) are passed on to inspect_batch, so frames from an idle line reuse
+    earlier detections and unchanged fixtures skip the model.
+    """
+    name = name or (os.path.basename(source) if isinstance(source, str) and os.path.isfile(source) else str(source))
+    stats = {} if stats is None else stats
+    reader = FrameReader(source, realtime, max_frames=max_frames)
+    # (frames, busy seconds) per batch: processing capacity, excluding time spent waiting for frames
+    recent = deque(maxlen=32)
+    start = time.perf_counter()
+    inspected = 0
+    try:
+        while True:
+            frames = reader.batch(batch_size)
+            done = frames[-1] is _EOF
+            if done:
+                frames.pop()
+            if frames:
+                batch_start = time.perf_counter()
+                named = ((f"{name}#{index:06d}", Image.fromarray(rgb)) for index, _, rgb in frames)
+                for (index, position, _), inspection in zip(frames, inspect_batch(
+                        model, named, confidence, enhance, batch_size, duplicates,
+                        reference)):
+                    inspection['frame_index'] = index
+                    inspection['position'] = position
+                    yield inspection
+                inspected += len(frames)
+                recent.append((len(frames), time.perf_counter() - batch_start))
+                busy = sum(seconds for _, seconds in recent)
+                reader.adapt(sum(n for n, _ in recent) / busy if busy else 0.0)
+            elapsed = time.perf_counter() - start
+            stats.update({
+                'source_fps': reader.source_fps,
+                'frame_count': reader.frame_count,
+                'frames_read': reader.frames_read,
+                'inspected': inspected,
+                'skipped': reader.skipped,
+                'dropped': reader.dropped,
+                'stride': reader.stride,
+                'fps': inspected / elapsed if elapsed else 0.0,
+                'elapsed': elapsed,
+                'error': reader.error,
+            })
+            if done:
+                return
+    finally:
+        reader.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AlfaStack AI video / camera-stream inspection")
+    parser.add_argument("source", help="Video file, RTSP/HTTP URL or camera number")
+    parser.add_argument("--output", "-o", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--conf", type=float, default=0.6, help="AI confidence threshold")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help="YOLO weights file")
+    parser.add_argument("--batch-size", type=int, default=4, help="Frames per YOLO call")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Pace files at their frame rate and skip/drop frames to keep up")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many decoded frames")
+    parser.add_argument("--no-enhance", action="store_true", help="Skip sharpness/contrast enhancement")
+    args = parser.parse_args(argv)
+
+    model = load_yolo(args.weights)
+    stats = {}
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for inspection in inspect_video(model, args.source, args.conf, not args.no_enhance, args.batch_size,
+                                        args.realtime, args.max_frames, stats=stats):
+            record = json_record(inspection, model.names)
+            record['frame'] = inspection['frame_index']
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ Inspected {stats.get('inspected', 0)} frames ({stats.get('skipped', 0)} skipped, "
+          f"{stats.get('dropped', 0)} dropped) at {stats.get('fps', 0):.1f} fps "
+          f"(source {stats.get('source_fps', 0):.1f} fps)", file=sys.stderr)
+    return 1 if stats.get('error') else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,317 @@
+"""Multi-process inference pool shared by all Streamlit sessions.
+
+Each worker process loads its own copy of the model with a pinned thread
+count, so concurrent stations use separate cores instead of contending on one
+in-process model. Frames are queued per session and dispatched round-robin
+across sessions whenever a worker is free, so one large batch cannot starve a
+single-image inspection from another station.
+
+``pool.model_for(session)`` returns a callable with the YOLO calling
+convention (``model(frames, conf=...)`` -> Results list, ``.names``), so the
+existing detect / inspect_batch / tiled paths run on the pool unchanged.
+
+A worker that dies (crash, OOM kill) marks the whole pool as failed: every
+waiting frame fails with PoolUnavailable, and the pool has to be restarted
+(PoolManager.configure). Closing the pool fails waiting frames the same way.
+An exception inside a worker fails only that frame, with WorkerError (a
+PoolUnavailable, so callers handle both alike).
+"""
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from detections import Detections
+from instrumentation import LatencyHistogram
+
+RESULT_TIMEOUT = 120
+
+
+class PoolUnavailable(RuntimeError):
+    """The pool cannot serve a frame: a worker died, the pool was shut down or no result came in time"""
+
+
+class WorkerError(PoolUnavailable):
+    """A worker raised while running inference on a frame"""
+
+
+def default_threads(workers):
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _worker_main(weights, backend, threads, tasks, results):
+    # Pin thread pools before torch / onnxruntime are imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        from backends import load_backend
+        model = load_backend(weights, backend, threads)
+        model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    except Exception as e:
+        results.put(('failed', os.getpid(), f"{type(e).__name__}: {e}"))
+        return
+    results.put(('ready', os.getpid(), dict(model.names)))
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, image_np, conf = task
+        start = time.perf_counter()
+        try:
+            result = model(image_np, conf=conf, verbose=False)[0]
+            dets = Detections.from_result(result)
+            results.put((task_id, (dets.xyxy, dets.conf, dets.cls), time.perf_counter() - start))
+        except Exception as e:
+            results.put((task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class PoolModel:
+    """Model-like view of the pool for one session"""
+
+    def __init__(self, pool, session):
+        self.pool = pool
+        self.session = session
+
+    @property
+    def names(self):
+        return self.pool.names
+
+    def __call__(self, source, conf=0.25, verbose=False, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        futures = [self.pool.submit(self.session, frame, conf) for frame in frames]
+        try:
+            return [Detections(*future.result(timeout=RESULT_TIMEOUT)).to_result(frame, self.names)
+                    for frame, future in zip(frames, futures)]
+        except FutureTimeout:
+            # The caller gives up on every frame of this call; don't leave them queued or pending
+            self.pool.discard(self.session, futures)
+            raise PoolUnavailable(f"No result from the inference pool within {RESULT_TIMEOUT} s") from None
+
+
+class InferencePool:
+    """Worker processes behind per-session queues with round-robin dispatch"""
+
+    def __init__(self, weights, backend="pytorch", workers=2, threads=None):
+        self.weights = weights
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        self.threads = threads or default_threads(self.workers)
+        self.names = None
+        self.error = None
+
+        ctx = multiprocessing.get_context("spawn")  # never fork a process holding torch threads
+        self._tasks = ctx.Queue()
+        # Frames nobody will read (dead workers) must not block interpreter exit
+        self._tasks.cancel_join_thread()
+        self._results = ctx.Queue()
+        self._processes = [ctx.Process(target=_worker_main, name=f"inference-worker-{i}", daemon=True,
+                                       args=(weights, backend, self.threads, self._tasks, self._results))
+                           for i in range(self.workers)]
+        for process in self._processes:
+            process.start()
+
+        self._cond = threading.Condition()
+        self._sessions = OrderedDict()  # session -> deque of waiting tasks, in round-robin order
+        self._pending = {}
+        self._ids = itertools.count()
+        self._ready = 0
+        self._in_flight = 0
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self._queue_wait = LatencyHistogram()
+        self._service_time = LatencyHistogram()
+        self._finished_at = deque(maxlen=256)
+
+        threading.Thread(target=self._dispatch, name="pool-dispatch", daemon=True).start()
+        threading.Thread(target=self._collect, name="pool-collect", daemon=True).start()
+        threading.Thread(target=self._watch, name="pool-watch", daemon=True).start()
+
+    def is_ready(self):
+        return self._ready == self.workers and self.error is None
+
+    def model_for(self, session):
+        return PoolModel(self, session)
+
+    def submit(self, session, image_np, conf=0.25):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise PoolUnavailable(self.error or "Inference pool is shut down")
+            task_id = next(self._ids)
+            self._pending[task_id] = future
+            self._sessions.setdefault(session, deque()).append((task_id, image_np, conf, time.perf_counter()))
+            self._cond.notify_all()
+        return future
+
+    def discard(self, session, futures):
+        """Forget futures nobody waits for any more; frames not yet dispatched are dropped"""
+        futures = set(futures)
+        with self._cond:
+            task_ids = {task_id for task_id, future in self._pending.items() if future in futures}
+            for task_id in task_ids:
+                del self._pending[task_id]
+            waiting = self._sessions.get(session)
+            if waiting:
+                kept = deque(task for task in waiting if task[0] not in task_ids)
+                if kept:
+                    self._sessions[session] = kept
+                else:
+                    del self._sessions[session]
+            self._cond.notify_all()
+        for future in futures:
+            future.cancel()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._closed and (not self._sessions or self._in_flight >= max(1, self._ready)):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Next session in turn gives up one frame, then goes to the back of the line
+                session, waiting = next(iter(self._sessions.items()))
+                task_id, image_np, conf, enqueued = waiting.popleft()
+                if waiting:
+                    self._sessions.move_to_end(session)
+                else:
+                    del self._sessions[session]
+                self._in_flight += 1
+                self._queue_wait.add(time.perf_counter() - enqueued)
+            self._tasks.put((task_id, image_np, conf))
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            kind = message[0]
+            if kind in ('ready', 'failed'):
+                with self._cond:
+                    if kind == 'ready':
+                        self._ready += 1
+                        self.names = message[2]
+                    else:
+                        # More specific than the exit noticed by _watch, so it wins
+                        self.error = message[2]
+                    self._cond.notify_all()
+                continue
+            task_id, arrays, detail = message
+            with self._cond:
+                self._in_flight -= 1
+                future = self._pending.pop(task_id, None)
+                if arrays is None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                    self._service_time.add(detail)
+                    self._finished_at.append(time.perf_counter())
+                self._cond.notify_all()
+            if future is None or future.done():
+                continue
+            if arrays is None:
+                future.set_exception(WorkerError(f"Inference worker failed: {detail}"))
+            else:
+                future.set_result(arrays)
+
+    def _watch(self):
+        """Fail the pool as soon as any worker process exits while it is open"""
+        sentinels = {process.sentinel: process for process in self._processes}
+        while True:
+            exited = multiprocessing.connection.wait(list(sentinels), timeout=1.0)
+            with self._cond:
+                if self._closed:
+                    return
+            if exited:
+                process = sentinels[exited[0]]
+                process.join(timeout=1)  # reap it, so exitcode is set
+                self._fail(f"Inference worker {process.name} (pid {process.pid}) exited unexpectedly "
+                           f"with code {process.exitcode}")
+                return
+
+    def _fail(self, error):
+        with self._cond:
+            if self.error is None:
+                self.error = error
+        self.close(self.error)
+
+    def stats(self):
+        with self._cond:
+            queued = sum(len(waiting) for waiting in self._sessions.values())
+            wait_p50, wait_p95, _ = self._queue_wait.percentiles()
+            service_p50, _, _ = self._service_time.percentiles()
+            finished = list(self._finished_at)
+            stats = {
+                'workers': self.workers,
+                'threads_per_worker': self.threads,
+                'ready': self._ready,
+                'in_flight': self._in_flight,
+                'queued': queued,
+                'waiting_sessions': len(self._sessions),
+                'completed': self.completed,
+                'failed': self.failed,
+                'queue_wait_p50_ms': wait_p50 * 1000,
+                'queue_wait_p95_ms': wait_p95 * 1000,
+                'inference_p50_ms': service_p50 * 1000,
+            }
+        span = finished[-1] - finished[0] if len(finished) > 1 else 0
+        stats['throughput_ips'] = (len(finished) - 1) / span if span else 0.0
+        return stats
+
+    def close(self, reason="Inference pool was shut down"):
+        """Stop the workers; frames still waiting fail with PoolUnavailable(reason)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            futures = list(self._pending.values())
+            self._pending.clear()
+            self._sessions.clear()
+            self._cond.notify_all()
+        for future in futures:
+            if not future.done():
+                future.set_exception(PoolUnavailable(reason))
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+
+
+class PoolManager:
+    """Holds the one server-wide pool; sessions whose model matches it run on it"""
+
+    def __init__(self):
+        self.pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self.pool.workers if self.pool is not None else 0
+
+    def configure(self, weights, backend, workers):
+        """Replace the pool (workers=0 shuts it down); a failed pool is always replaced"""
+        with self._lock:
+            pool = self.pool
+            if (pool is not None and pool.error is None
+                    and (pool.weights, pool.backend, pool.workers) == (weights, backend, workers)):
+                return pool
+            if pool is not None:
+                pool.close()
+            self.pool = InferencePool(weights, backend, workers) if workers else None
+            return self.pool
+
+    def pool_for(self, weights, backend):
+        pool = self.pool
+        if pool is not None and (pool.weights, pool.backend) == (weights, backend):
+            return pool
+        return None